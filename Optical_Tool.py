@@ -1,133 +1,339 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objs as go
 
 import os
-
-initial_folder = "Initial"
-final_folder = "Final"
-
-
-def is_excel_file(filename):
-    return filename.lower().endswith(('.xls', '.xlsx'))
-
-
-def read_excel_file(file_path):
-    try:
-        df = pd.read_excel(file_path)
-        return df
-    except Exception as e:
-        st.error(f"Nu s-a putut citi fișierul {file_path}: {e}")
-        return None
-
-
-def remove_empty_rows_from_df(df):
-    return df.dropna(how='all')
-
-
-def extract_rows_containing_keywords1(df, keywords):
-    extracted_rows = []
-    white_homogeneity_previous_rows = []
-    previous_row = None
-
-    for _, row in df.iterrows():
-        if "WhiteHomogeneity".lower() in row.astype(str).str.lower().tolist() and previous_row is not None:
-            white_homogeneity_previous_rows.append(previous_row)
-
-        for keyword in keywords:
-            if keyword.lower() in row.astype(str).str.lower().tolist():
-                extracted_rows.append(row)
-                break
-
-        previous_row = row
-
-    return pd.DataFrame(extracted_rows), pd.DataFrame(white_homogeneity_previous_rows)
-
-
-def extract_rows_containing_keywords2(df, keywords):
-    extracted_rows = []
-    black_homogeneity_previous_rows = []
-    previous_row = None
-
-    for _, row in df.iterrows():
-        if "BlackHomogeneity".lower() in row.astype(str).str.lower().tolist() and previous_row is not None:
-            black_homogeneity_previous_rows.append(previous_row)
-
-        for keyword in keywords:
-            if keyword.lower() in row.astype(str).str.lower().tolist():
-                extracted_rows.append(row)
-                break
-
-        previous_row = row
-
-    return pd.DataFrame(extracted_rows), pd.DataFrame(black_homogeneity_previous_rows)
-
-
-def combine_homogeneity(df):
-    df.replace('White Homogeneity', 'WhiteHomogeneity', regex=True, inplace=True)
-    df.replace('Black Homogeneity', 'BlackHomogeneity', regex=True, inplace=True)
-
-
-def process_files(uploaded_files, folder_type):
-    data = []
-
-    for file in uploaded_files:
-        if is_excel_file(file.name):
-            df = read_excel_file(file)
-            if df is not None:
-                cleaned_df = remove_empty_rows_from_df(df)
-                combine_homogeneity(cleaned_df)
-
-                spotmeter_white_homogeneity = None
-                white_homogeneity_values = None
-                spotmeter_black_homogeneity = None
-                black_homogeneity_values = None
-
-                keywords = ["Spotmeter #005", "WhiteHomogeneity", "BlackHomogeneity"]
-
-                extracted_rows_df, white_homogeneity_prev_rows_df1 = extract_rows_containing_keywords1(cleaned_df, keywords)
-                extracted_rows_df, white_homogeneity_prev_rows_df2 = extract_rows_containing_keywords1(extracted_rows_df, keywords) # we use df2
-
-                for _, row in white_homogeneity_prev_rows_df2.iterrows():
-                    if "Spotmeter #005".lower() in row.astype(str).str.lower().tolist():
-                        spotmeter_white_homogeneity = row["Unnamed: 4"]
-                        break
-
-                for _, row in white_homogeneity_prev_rows_df2.iterrows():
-                    if "WhiteHomogeneity".lower() in row.astype(str).str.lower().tolist():
-                        white_homogeneity_values = (row["Unnamed: 4"], row["Unnamed: 5"])
-                        break
-
-                extracted_rows_df, black_homogeneity_prev_rows_df1 = extract_rows_containing_keywords2(cleaned_df, keywords)
-                extracted_rows_df, black_homogeneity_prev_rows_df2 = extract_rows_containing_keywords2(extracted_rows_df, keywords)
-
-                for _, row in black_homogeneity_prev_rows_df2.iterrows():
-                    if "Spotmeter #005".lower() in row.astype(str).str.lower().tolist():
-                        spotmeter_black_homogeneity = row["Unnamed: 4"]
-                        break
-
-                for _, row in black_homogeneity_prev_rows_df2.iterrows():
-                    if "BlackHomogeneity".lower() in row.astype(str).str.lower().tolist():
-                        black_homogeneity_values = (row["Unnamed: 4"], row["Unnamed: 5"])
-                        break
-
-                info = {
-                    "file_name": os.path.basename(file.name),
-                    "initial_final": folder_type,
-                    "spotmeter_white_homogeneity": spotmeter_white_homogeneity,
-                    "white_homogeneity_values": white_homogeneity_values,
-                    "spotmeter_black_homogeneity": spotmeter_black_homogeneity,
-                    "black_homogeneity_values": black_homogeneity_values
-                }
-                data.append(info)
-
-    return data
+import time
+
+from optical_cache import ResultCache, dut_key
+from optical_charts import (build_color_drift_chart, build_color_figures, build_section_figures,
+                            default_large_campaign_threshold, default_top_n)
+from optical_color import color_dut_summary, compute_color_metrics, pair_color_points
+from optical_diagnostics import Diagnostics, configure_log, log_record
+from optical_metrics import (campaign_summary, compute_metrics, default_iqr_factor, default_z_threshold,
+                             deviation_columns)
+from optical_processing import (ProcessingJob, default_max_workers, final_folder, initial_folder, is_report_file,
+                                pair_duts, report_readers)
+from optical_store import MeasurementStore, default_store_path
+
+cache_dir = os.environ.get("OPTICAL_TOOL_CACHE_DIR")
+cache_max_mb = int(os.environ.get("OPTICAL_TOOL_CACHE_MB", "256"))
+store_path = os.environ.get("OPTICAL_TOOL_STORE", default_store_path)
+
+poll_seconds = 0.5
+# Every poll of a running job renders a new partial campaign, so the cached figures and tables keep only
+# the most recent ones instead of one entry per poll.
+figure_cache_entries = 16
+
+upload_types = [extension.lstrip(".") for extension in report_readers]
+
+configure_log(os.environ.get("OPTICAL_TOOL_DIAGNOSTICS_LOG", "-"))
+
+
+@st.cache_resource
+def get_result_cache():
+    return ResultCache(cache_dir=cache_dir, max_disk_bytes=cache_max_mb * 1024 * 1024)
+
+
+@st.cache_resource
+def get_measurement_store():
+    return MeasurementStore(store_path)
+
+
+def upload_key(file):
+    return file.name, file.size, getattr(file, "file_id", None)
+
+
+def process_uploads(uploads, max_workers=1, cache=None, kind="black_white"):
+    # uploads maps each folder type to its uploaded files. New files go to a background job and every rerun
+    # collects the records it has finished, so only parsed files are returned while the job is still running.
+    # Results are kept per upload in the session, so a rerun only parses the files added since the last one.
+    job_key = f"processing_job_{kind}"
+    job = st.session_state.get(job_key)
+    report_files = {folder_type: [file for file in files if is_report_file(file.name)]
+                    for folder_type, files in uploads.items()}
+    processed = {folder_type: st.session_state.setdefault(f"processed_{kind}_{folder_type}", {})
+                 for folder_type in uploads}
+    changed = False
+
+    if job is not None:
+        finished = job.done
+        for folder_type, key, result in job.drain():
+            processed[folder_type][key] = result
+            changed = True
+        if finished:
+            if job.error is not None:
+                st.error(f"Procesarea fișierelor s-a oprit: {job.error}")
+            del st.session_state[job_key]
+            job = None
+
+    if job is None:
+        batches = []
+        for folder_type, files in report_files.items():
+            new_files = [file for file in files if upload_key(file) not in processed[folder_type]]
+            if new_files:
+                # Contents are copied out of the uploads on the job's thread, one at a time, when the pool has room.
+                batches.append((folder_type, [upload_key(file) for file in new_files],
+                                ((os.path.basename(file.name), file.getvalue()) for file in new_files)))
+        if batches:
+            job = st.session_state[job_key] = ProcessingJob(batches, max_workers, cache, kind)
+
+    data = {}
+    for folder_type, files in report_files.items():
+        upload_keys = [upload_key(file) for file in files]
+        removed_keys = set(processed[folder_type]).difference(upload_keys)
+        for key in removed_keys:
+            del processed[folder_type][key]
+        changed = changed or bool(removed_keys)
+
+        data[folder_type] = []
+        for key in upload_keys:
+            if key not in processed[folder_type]:
+                continue
+            info, error, _ = processed[folder_type][key]
+            if error is not None:
+                st.error(f"Nu s-a putut citi fișierul {os.path.basename(key[0])}: {error}")
+            else:
+                data[folder_type].append(info)
+
+    if changed:
+        st.session_state[f"upload_revision_{kind}"] = st.session_state.get(f"upload_revision_{kind}", 0) + 1
+
+    return data[initial_folder], data[final_folder], job
+
+
+def show_progress(job):
+    if job is None:
+        return
+    eta = job.eta_seconds()
+    eta_text = f" - aprox. {eta:.0f}s rămase" if eta is not None else ""
+    st.progress(job.consumed / job.total, text=f"Procesare fișiere: {job.consumed} din {job.total}{eta_text}")
+
+
+def poll_job(job):
+    # While files are still being parsed, rerun shortly so the page fills in with the next finished records.
+    if job is not None:
+        time.sleep(poll_seconds)
+        st.rerun()
+
+
+def file_diagnostics(kind="black_white"):
+    return [stats for folder_type in (initial_folder, final_folder)
+            for _, _, stats in st.session_state.get(f"processed_{kind}_{folder_type}", {}).values()]
+
+
+def show_diagnostics(page_record, kind="black_white"):
+    with st.expander("Diagnostics"):
+        rss = page_record["rss_bytes"]
+        peak_rss = page_record["process_peak_rss_bytes"]
+        rss_text = f", server RSS {rss / 2 ** 20:.0f} MiB" if rss is not None else ""
+        peak_text = f" (process peak {peak_rss / 2 ** 20:.0f} MiB)" if peak_rss is not None else ""
+        st.write(f"Page run: {page_record['total_seconds']:.3f}s{rss_text}{peak_text}")
+        stages = list(page_record["stages"])
+        rss_deltas = page_record["stage_rss_delta_bytes"]
+        st.dataframe(pd.DataFrame({"Stage": stages,
+                                   "Seconds": [page_record["stages"][stage] for stage in stages],
+                                   "RSS delta (MiB)": [rss_deltas[stage] / 2 ** 20 if stage in rss_deltas else None
+                                                       for stage in stages]}), hide_index=True)
+
+        file_records = file_diagnostics(kind)
+        if file_records:
+            st.dataframe(pd.json_normalize(file_records), hide_index=True)
+
+
+def show_archive(all_data):
+    store = get_measurement_store()
+
+    with st.expander("Arhivă măsurători"):
+        campaign = st.text_input("Campanie", key="campaign")
+        if st.button("Salvează DUT-urile în arhivă", disabled=not campaign, key="save_campaign"):
+            saved = store.append(all_data, campaign)
+            st.success(f"{saved} DUT-uri salvate în campania '{campaign}'.")
+
+        if st.checkbox("Tendință pe campanii", key="show_campaign_trend"):
+            st.dataframe(store.campaigns(), hide_index=True)
+            # Empty until a start date is picked; while only the start is picked the range is that single day.
+            period = st.date_input("Perioadă", value=(), key="campaign_period")
+            since, until = (period[0].isoformat(), period[-1].isoformat()) if period else (None, None)
+            st.dataframe(store.campaign_summary(since=since, until=until), hide_index=True)
+
+        dut_name = st.text_input("Istoric DUT", key="dut_history")
+        if dut_name:
+            st.dataframe(store.dut_history(dut_name), hide_index=True)
+
+
+def paired_metrics(initial_data, final_data):
+    # Pairing and metrics only change when an upload is added or removed, not on every widget rerun.
+    revision = st.session_state.get("upload_revision_black_white", 0)
+    cached = st.session_state.get("paired_metrics")
+    if cached is None or cached[0] != revision:
+        paired_df, unmatched_initial, unmatched_final = pair_duts(initial_data, final_data)
+        cached = (revision, (paired_df, unmatched_initial, unmatched_final, compute_metrics(paired_df)))
+        st.session_state["paired_metrics"] = cached
+    return cached[1]
+
+
+@st.cache_data(show_spinner=False, max_entries=figure_cache_entries)
+def section_figures(metrics_df, initial_column, final_column, deviation_column, large_campaign_threshold, top_n):
+    # Cached on the metrics table contents, so reruns with the same campaign reuse the built figures.
+    return build_section_figures(metrics_df, initial_column, final_column, deviation_column,
+                                 large_campaign_threshold, top_n)
+
+
+def show_section_charts(metrics_df, initial_column, final_column, deviation_column, large_campaign_threshold, top_n,
+                        diagnostics):
+    with diagnostics.stage("charts"):
+        for fig in section_figures(metrics_df, initial_column, final_column, deviation_column,
+                                   large_campaign_threshold, top_n):
+            st.plotly_chart(fig)
 
 
-def process_files_with_spinner(uploaded_files, folder_type):
-    with st.spinner("### **Please wait while your data is processed...**"):
-        data = process_files(uploaded_files, folder_type)
-    return data
+def summary_settings():
+    with st.expander("Limite pass/fail"):
+        z_threshold = st.number_input("Prag z robust", min_value=0.5, value=default_z_threshold, step=0.5,
+                                      key="z_threshold")
+        iqr_factor = st.number_input("Factor IQR", min_value=0.5, value=default_iqr_factor, step=0.5, key="iqr_factor")
+        # 0 leaves the metric without a limit.
+        limits = {column: st.number_input(f"Deviație maximă {label} (%, 0 = fără limită)", min_value=0.0, value=0.0,
+                                          step=1.0, key=f"limit_{column}") or None
+                  for column, label in deviation_columns.items()}
+    return limits, z_threshold, iqr_factor
+
+
+@st.cache_data(show_spinner=False, max_entries=figure_cache_entries)
+def summary_tables(metrics_df, limits, z_threshold, iqr_factor):
+    return campaign_summary(metrics_df, limits, z_threshold, iqr_factor)
+
+
+def show_campaign_summary(metrics_df, diagnostics):
+    limits, z_threshold, iqr_factor = summary_settings()
+    with diagnostics.stage("summary"):
+        summary_df, failures_df = summary_tables(metrics_df, limits, z_threshold, iqr_factor)
+
+    with diagnostics.stage("tables"):
+        st.dataframe(summary_df.rename(columns={
+            'metric': "Metric",
+            'duts': "DUTs",
+            'mean': "Mean (%)",
+            'median': "Median (%)",
+            'p05': "P5 (%)",
+            'p95': "P95 (%)",
+            'min': "Min (%)",
+            'max': "Max (%)",
+            'mad': "MAD",
+            'iqr': "IQR",
+            'limit': "Limit (%)",
+            'outliers': "Outliers",
+            'over_limit': "Over limit",
+            'pass_rate': "Pass rate (%)"
+        }), hide_index=True)
+
+        st.write(f"DUT-uri semnalate: {failures_df['dut_name'].nunique()} din {len(metrics_df)}")
+        if not failures_df.empty:
+            st.dataframe(failures_df.rename(columns={
+                'dut_name': "DUT",
+                'metric': "Metric",
+                'deviation': "Deviation (%)",
+                'robust_z': "Robust z",
+                'outlier': "Outlier",
+                'over_limit': "Over limit"
+            }), hide_index=True)
+
+
+def dut_info_frame(all_data):
+    rows = []
+    for dut_info in all_data:
+        white_values = dut_info['white_homogeneity_values'] or (None, None)
+        black_values = dut_info['black_homogeneity_values'] or (None, None)
+        rows.append({
+            "Fișier": dut_info['file_name'],
+            "Initial/Final": dut_info['initial_final'],
+            "Spotmeter #005 WhiteHomogeneity": dut_info['spotmeter_white_homogeneity'],
+            "WhiteHomogeneity first value": white_values[0],
+            "WhiteHomogeneity second value": white_values[1],
+            "Spotmeter #005 BlackHomogeneity": dut_info['spotmeter_black_homogeneity'],
+            "BlackHomogeneity first value": black_values[0],
+            "BlackHomogeneity second value": black_values[1]
+        })
+
+    info_df = pd.DataFrame(rows, columns=["Fișier", "Initial/Final", "Spotmeter #005 WhiteHomogeneity",
+                                          "WhiteHomogeneity first value", "WhiteHomogeneity second value",
+                                          "Spotmeter #005 BlackHomogeneity", "BlackHomogeneity first value",
+                                          "BlackHomogeneity second value"])
+    # Numeric columns stay numeric so the grid sorts them by value. Text cells (e.g. "ok") next to numbers would
+    # make Arrow reject the column, so only those mixed columns are shown as text, with blank cells left empty.
+    for column in info_df.columns[2:]:
+        values = info_df[column]
+        numbers = pd.to_numeric(values, errors="coerce")
+        if numbers.notna().sum() == values.notna().sum():
+            info_df[column] = numbers
+        else:
+            info_df[column] = values.astype(str).where(values.notna(), None)
+    return info_df
+
+
+def show_metrics_table(metrics_df, columns, diagnostics):
+    with diagnostics.stage("tables"):
+        table_df = metrics_df[['dut_name'] + list(columns)].rename(columns={'dut_name': "DUT", **columns})
+        st.dataframe(table_df, hide_index=True)
+
+
+def show_dut_details(dut_name, all_data, metrics_df):
+    # Only the selected DUT is written out line by line; everything else stays in the tables.
+    with st.expander(f"DUT: {dut_name}", expanded=True):
+        for dut_info in all_data:
+            if dut_key(dut_info['file_name']) != dut_name:
+                continue
+            white_values = dut_info['white_homogeneity_values'] or (None, None)
+            black_values = dut_info['black_homogeneity_values'] or (None, None)
+            st.write(f"Fișier: {dut_info['file_name']} - {dut_info['initial_final']}")
+            st.write(f"Spotmeter #005 WhiteHomogeneity: {dut_info['spotmeter_white_homogeneity']}")
+            st.write(f"WhiteHomogeneity first value: {white_values[0]}")
+            st.write(f"WhiteHomogeneity second value: {white_values[1]}")
+            st.write(f"Spotmeter #005 BlackHomogeneity: {dut_info['spotmeter_black_homogeneity']}")
+            st.write(f"BlackHomogeneity first value: {black_values[0]}")
+            st.write(f"BlackHomogeneity second value: {black_values[1]}")
+            st.write("")  # Line break between entries
+
+        for dut in metrics_df[metrics_df['dut_name'] == dut_name].itertuples(index=False):
+            st.write(f"Luminance White deviation(%): {dut.white_deviation}")
+            st.write(f"Luminance Black deviation(%): {dut.black_deviation}")
+            st.write(f"Contrast Initial: {dut.initial_contrast} / Final: {dut.final_contrast}")
+            st.write(f"Contrast deviation(%): {dut.contrast_deviation}")
+            st.write(f"Homogeneity (White) Initial: {dut.initial_homogeneity_white} / Final: {dut.final_homogeneity_white}")
+            st.write(f"Homogeneity (White) deviation(%): {dut.homogeneity_white_deviation}")
+            st.write(f"Homogeneity (Black) Initial: {dut.initial_homogeneity_black} / Final: {dut.final_homogeneity_black}")
+            st.write(f"Homogeneity (Black) deviation(%): {dut.homogeneity_black_deviation}")
+
+
+def sidebar_settings():
+    max_workers = st.sidebar.number_input("Procese paralele", min_value=1, value=default_max_workers, step=1,
+                                          key="max_workers")
+    large_campaign_threshold = st.sidebar.number_input("Prag grafice agregate (DUT-uri)", min_value=1,
+                                                       value=default_large_campaign_threshold, step=50,
+                                                       key="large_campaign_threshold")
+    top_n = st.sidebar.number_input("Top DUT-uri afișate", min_value=1, value=default_top_n, step=5, key="top_n")
+    return max_workers, large_campaign_threshold, top_n
+
+
+def color_metrics(initial_data, final_data):
+    revision = st.session_state.get("upload_revision_color", 0)
+    cached = st.session_state.get("color_metrics")
+    if cached is None or cached[0] != revision:
+        paired_df, unmatched_initial, unmatched_final = pair_color_points(initial_data, final_data)
+        metrics_df = compute_color_metrics(paired_df)
+        cached = (revision, (unmatched_initial, unmatched_final, metrics_df, color_dut_summary(metrics_df)))
+        st.session_state["color_metrics"] = cached
+    return cached[1]
+
+
+@st.cache_data(show_spinner=False, max_entries=figure_cache_entries)
+def color_figures(summary_df, value_column, value_title, large_campaign_threshold, top_n):
+    return build_color_figures(summary_df, value_column, value_title, large_campaign_threshold, top_n)
+
+
+@st.cache_data(show_spinner=False, max_entries=figure_cache_entries)
+def color_drift_figure(metrics_df):
+    return build_color_drift_chart(metrics_df)
 
 
 def page1():
@@ -136,361 +342,260 @@ def page1():
     col1, col2 = st.columns(2)
 
     with col1:
-        st.write("Drag and drop excel files for **'Initial'** here:")
-        initial_uploaded_files = st.file_uploader("", type=["xls", "xlsx"], accept_multiple_files=True,
+        st.write("Drag and drop report files (xls, xlsx, csv, parquet) for **'Initial'** here:")
+        initial_uploaded_files = st.file_uploader("", type=upload_types, accept_multiple_files=True,
                                                   key="initial_file_uploader")
 
     with col2:
-        st.write("Drag and drop excel files for **'Final'** here:")
-        final_uploaded_files = st.file_uploader("", type=["xls", "xlsx"], accept_multiple_files=True,
+        st.write("Drag and drop report files (xls, xlsx, csv, parquet) for **'Final'** here:")
+        final_uploaded_files = st.file_uploader("", type=upload_types, accept_multiple_files=True,
                                                 key="final_file_uploader")
 
+    max_workers, large_campaign_threshold, top_n = sidebar_settings()
+    cache = get_result_cache()
 
     if initial_uploaded_files or final_uploaded_files:
-        initial_data = []
-        final_data = []
         all_data = []
 
-        if initial_uploaded_files:
-            initial_data = process_files_with_spinner(initial_uploaded_files, initial_folder)
-            all_data.extend(initial_data)
-
-        if final_uploaded_files:
-            final_data = process_files_with_spinner(final_uploaded_files, final_folder)
-            all_data.extend(final_data)
-
-        combined_data_white = []
-
-        for initial_dut in initial_data:
-            dut_name = initial_dut['file_name']
-            for final_dut in final_data:
-                if final_dut['file_name'] == dut_name:
-                    combined_data_white.append({
-                        "dut_name": dut_name,
-                        "initial_spotmeter_white": initial_dut['spotmeter_white_homogeneity'],
-                        "final_spotmeter_white": final_dut['spotmeter_white_homogeneity'],
-                    })
-
-        combined_data_black = []
-
-        for initial_dut in initial_data:
-            dut_name = initial_dut['file_name']
-            for final_dut in final_data:
-                if final_dut['file_name'] == dut_name:
-                    combined_data_black.append({
-                        "dut_name": dut_name,
-                        "initial_spotmeter_black": initial_dut['spotmeter_black_homogeneity'],
-                        "final_spotmeter_black": final_dut['spotmeter_black_homogeneity']
-                    })
-
-        combined_data_white_black = []
-
-        for initial_dut in initial_data:
-            dut_name = initial_dut['file_name']
-            for final_dut in final_data:
-                if final_dut['file_name'] == dut_name:
-                    combined_data_white_black.append({
-                        "dut_name": dut_name,
-                        "initial_spotmeter_black": initial_dut['spotmeter_black_homogeneity'],
-                        "initial_spotmeter_white": initial_dut['spotmeter_white_homogeneity'],
-                        "final_spotmeter_white": final_dut['spotmeter_white_homogeneity'],
-                        "final_spotmeter_black": final_dut['spotmeter_black_homogeneity']
-                    })
-
-        combined_data_first_second_value_white = []
-
-        for initial_dut in initial_data:
-            dut_name = initial_dut['file_name']
-            for final_dut in final_data:
-                if final_dut['file_name'] == dut_name:
-                    combined_data_first_second_value_white.append({
-                        "dut_name": dut_name,
-                        "initial_first_value_white": initial_dut['white_homogeneity_values'][0],
-                        "initial_second_value_white": initial_dut['white_homogeneity_values'][1],
-                        "final_first_value_white": final_dut['white_homogeneity_values'][0],
-                        "final_second_value_white": final_dut['white_homogeneity_values'][1]
-                    })
-
-        combined_data_first_second_value_black = []
-
-        for initial_dut in initial_data:
-            dut_name = initial_dut['file_name']
-            for final_dut in final_data:
-                if final_dut['file_name'] == dut_name:
-                    combined_data_first_second_value_black.append({
-                        "dut_name": dut_name,
-                        "initial_first_value_black": initial_dut['black_homogeneity_values'][0],
-                        "initial_second_value_black": initial_dut['black_homogeneity_values'][1],
-                        "final_first_value_black": final_dut['black_homogeneity_values'][0],
-                        "final_second_value_black": final_dut['black_homogeneity_values'][1]
-                    })
+        diagnostics = Diagnostics(page="Black and White")
+
+        with diagnostics.stage("process"):
+            initial_data, final_data, job = process_uploads({initial_folder: initial_uploaded_files or [],
+                                                             final_folder: final_uploaded_files or []},
+                                                            max_workers, cache)
+        all_data.extend(initial_data)
+        all_data.extend(final_data)
+        show_progress(job)
+
+        st.sidebar.caption(f"Cache: {cache.hits} hits / {cache.misses} misses")
+
+        with diagnostics.stage("pair_metrics"):
+            _, unmatched_initial, unmatched_final, metrics_df = paired_metrics(initial_data, final_data)
+
+        # Until every file is parsed, a missing partner may simply not have been reached yet.
+        if job is None and initial_data and final_data and (unmatched_initial or unmatched_final):
+            if unmatched_initial:
+                st.warning(f"DUT-uri fără pereche în 'Final': {', '.join(unmatched_initial)}")
+            if unmatched_final:
+                st.warning(f"DUT-uri fără pereche în 'Initial': {', '.join(unmatched_final)}")
 
         if all_data:
             st.subheader("Informații DUT:")
-            for dut_info in all_data:
-                st.write(f"Fișier: {dut_info['file_name']} - {dut_info['initial_final']}")
-                st.write(f"Spotmeter #005 WhiteHomogeneity: {dut_info['spotmeter_white_homogeneity']}")
-                st.write(f"WhiteHomogeneity first value: {dut_info['white_homogeneity_values'][0]}")
-                st.write(f"WhiteHomogeneity second value: {dut_info['white_homogeneity_values'][1]}")
-                st.write(f"Spotmeter #005 BlackHomogeneity: {dut_info['spotmeter_black_homogeneity']}")
-                st.write(f"BlackHomogeneity first value: {dut_info['black_homogeneity_values'][0]}")
-                st.write(f"BlackHomogeneity second value: {dut_info['black_homogeneity_values'][1]}")
-                st.write("")  # Line break between entries
-
-        if combined_data_white:        #-------------LUMINANCE WHITE CHART----------------#
-            st.subheader("Luminance White Chart:")
 
-            all_chart_data = []
+            dut_filter = st.text_input("Filtru DUT", key="dut_filter")
+            info_df = dut_info_frame(all_data)
+            metrics_view = metrics_df
+            if dut_filter:
+                info_df = info_df[info_df["Fișier"].str.contains(dut_filter, case=False, regex=False)]
+                metrics_view = metrics_df[metrics_df["dut_name"].str.contains(dut_filter, case=False, regex=False)]
 
-            for dut_info in combined_data_white:
-                dut_name = dut_info['dut_name']
-                initial_value = dut_info['initial_spotmeter_white']
-                final_value = dut_info['final_spotmeter_white']
-                sum_values = ((final_value / initial_value) * 100) - 100
+            with diagnostics.stage("tables"):
+                st.dataframe(info_df, hide_index=True)
 
-                all_chart_data.append({
-                    'DUT': dut_name,
-                    'Initial Value': initial_value,
-                    'Final Value': final_value,
-                })
+            dut_names = list(dict.fromkeys(dut_key(file_name) for file_name in info_df["Fișier"]))
+            selected_dut = st.selectbox("Detalii DUT", [""] + dut_names, key="selected_dut")
+            if selected_dut:
+                show_dut_details(selected_dut, all_data, metrics_df)
 
-                st.write(f"DUT: {dut_name}")
-                st.write(f"Initial Spotmeter #005 WhiteHomogeneity: {initial_value}")
-                st.write(f"Final Spotmeter #005 WhiteHomogeneity: {final_value}")
-                st.write(f"Deviation White Homogeneity(%): {sum_values}")
-                st.write("")  # Line break between entries
+        if not metrics_df.empty:        #-------------CAMPAIGN SUMMARY----------------#
+            st.subheader("Campaign Summary:")
+            show_campaign_summary(metrics_df, diagnostics)
+            st.write("")
 
-            chart_df = pd.DataFrame(all_chart_data)
-            fig = go.Figure(data=[
-                go.Bar(name='Initial Value', x=chart_df['DUT'], y=chart_df['Initial Value']),
-                go.Bar(name='Final Value', x=chart_df['DUT'], y=chart_df['Final Value'])
-            ])
+        if not metrics_df.empty:        #-------------LUMINANCE WHITE CHART----------------#
+            st.subheader("Luminance White Chart:")
 
-            fig.update_layout(barmode='group', xaxis_title='DUT', yaxis_title='Value', width=800, height=400)
+            show_metrics_table(metrics_view, {
+                'initial_spotmeter_white': "Initial Spotmeter #005 WhiteHomogeneity",
+                'final_spotmeter_white': "Final Spotmeter #005 WhiteHomogeneity",
+                'white_deviation': "Deviation White Homogeneity(%)"
+            }, diagnostics)
 
             st.write("<div style='display: flex; justify-content: center;'><h3>Luminance White Chart</h3></div>", unsafe_allow_html=True)
-            st.plotly_chart(fig)
+            show_section_charts(metrics_df, 'initial_spotmeter_white', 'final_spotmeter_white', 'white_deviation',
+                                large_campaign_threshold, top_n, diagnostics)
             st.write("")
 
-        if combined_data_black:     #------------------LUMINANCE BLACK CHART------------------#
+        if not metrics_df.empty:     #------------------LUMINANCE BLACK CHART------------------#
             st.subheader("Luminance Black Chart:")
 
-            all_chart_data = []
-
-            for dut_info in combined_data_black:
-                dut_name = dut_info['dut_name']
-                initial_value = dut_info['initial_spotmeter_black']
-                final_value = dut_info['final_spotmeter_black']
-                sum_values = ((final_value / initial_value) * 100) - 100
-
-                all_chart_data.append({
-                    'DUT': dut_name,
-                    'Initial Value': initial_value,
-                    'Final Value': final_value,
-                })
-
-                st.write(f"DUT: {dut_name}")
-                st.write(f"Initial Spotmeter #005 BlackHomogeneity: {initial_value}")
-                st.write(f"Final Spotmeter #005 BlackHomogeneity: {final_value}")
-                st.write(f"Deviation Black Homogeneity(%): {sum_values}")
-                st.write("")  # Line break between entries
-
-            chart_df = pd.DataFrame(all_chart_data)
-            fig = go.Figure(data=[
-                go.Bar(name='Initial Value', x=chart_df['DUT'], y=chart_df['Initial Value']),
-                go.Bar(name='Final Value', x=chart_df['DUT'], y=chart_df['Final Value'])
-            ])
-
-            fig.update_layout(barmode='group', xaxis_title='DUT', yaxis_title='Value', width=800, height=400)
+            show_metrics_table(metrics_view, {
+                'initial_spotmeter_black': "Initial Spotmeter #005 BlackHomogeneity",
+                'final_spotmeter_black': "Final Spotmeter #005 BlackHomogeneity",
+                'black_deviation': "Deviation Black Homogeneity(%)"
+            }, diagnostics)
 
             st.write("<div style='display: flex; justify-content: center;'><h3>Luminance Black Chart</h3></div>", unsafe_allow_html=True)
-            st.plotly_chart(fig)
+            show_section_charts(metrics_df, 'initial_spotmeter_black', 'final_spotmeter_black', 'black_deviation',
+                                large_campaign_threshold, top_n, diagnostics)
             st.write("")
 
-        if combined_data_white_black:        #---------------CONTRAST CHART----------------#
+        if not metrics_df.empty:        #---------------CONTRAST CHART----------------#
             st.subheader("Contrast Chart:")
 
-            all_chart_data = []
-
-            for dut_info in combined_data_white_black:
-                dut_name = dut_info['dut_name']
-                initial_value_white = dut_info['initial_spotmeter_white']
-                final_value_black = dut_info['final_spotmeter_black']
-                final_value_white = dut_info['final_spotmeter_white']
-                initial_value_black = dut_info['initial_spotmeter_black']
-
-                x = initial_value_white/initial_value_black
-                y = final_value_white/final_value_black
-
-                sum_values = ((y / x) * 100) - 100
-
-                all_chart_data.append({
-                    'DUT': dut_name,
-                    'Initial Value': x,
-                    'Final Value': y,
-                })
-
-                st.write(f"DUT: {dut_name}")
-                st.write(f"Initial Spotmeter #005 BlackHomogeneity: {initial_value_black}")
-                st.write(f"Final Spotmeter #005 BlackHomogeneity: {final_value_black}")
-                st.write(f"Initial Spotmeter #005 WhiteHomogeneity: {initial_value_white}")
-                st.write(f"Final Spotmeter #005 WhiteHomogeneity: {final_value_white}")
-                st.write(f"Initial: {x}")
-                st.write(f"Final: {y}")
-
-                st.write(f"Deviation Contrast(%): {sum_values}")
-                st.write("")  # Line break between entries
-
-            chart_df = pd.DataFrame(all_chart_data)
-
-            fig = go.Figure()
-            for col in chart_df.columns[1:]:
-                fig.add_trace(go.Bar(name=col, x=chart_df['DUT'], y=chart_df[col]))
-
-            fig.update_layout(barmode='group', xaxis_title='DUT', yaxis_title='Value', width=800, height=400)
+            show_metrics_table(metrics_view, {
+                'initial_spotmeter_black': "Initial Spotmeter #005 BlackHomogeneity",
+                'final_spotmeter_black': "Final Spotmeter #005 BlackHomogeneity",
+                'initial_spotmeter_white': "Initial Spotmeter #005 WhiteHomogeneity",
+                'final_spotmeter_white': "Final Spotmeter #005 WhiteHomogeneity",
+                'initial_contrast': "Initial",
+                'final_contrast': "Final",
+                'contrast_deviation': "Deviation Contrast(%)"
+            }, diagnostics)
 
             st.write("<div style='display: flex; justify-content: center;'><h3>Contrast Chart</h3></div>", unsafe_allow_html=True)
-            st.plotly_chart(fig)
+            show_section_charts(metrics_df, 'initial_contrast', 'final_contrast', 'contrast_deviation',
+                                large_campaign_threshold, top_n, diagnostics)
             st.write("")
 
-        if combined_data_first_second_value_white:          #---------------HOMOGENEITY WHITE CHART----------------#
+        if not metrics_df.empty:          #---------------HOMOGENEITY WHITE CHART----------------#
             st.subheader("Homogeneity (White) Chart:")
 
-            all_chart_data = []
-
-            for dut_info in combined_data_first_second_value_white:
-                dut_name = dut_info['dut_name']
-                initial_first_value_white = dut_info['initial_first_value_white']
-                initial_second_value_white = dut_info['initial_second_value_white']
-                final_first_value_white = dut_info['final_first_value_white']
-                final_second_value_white = dut_info['final_second_value_white']
-
-                try:
-                    initial_first_value_white = float(initial_first_value_white)
-                except (ValueError, TypeError):
-                    initial_first_value_white = 0
-
-                try:
-                    initial_second_value_white = float(initial_second_value_white)
-                except (ValueError, TypeError):
-                    initial_second_value_white = 0
-
-                try:
-                    final_first_value_white = float(final_first_value_white)
-                except (ValueError, TypeError):
-                    final_first_value_white = 0
-
-                try:
-                    final_second_value_white = float(final_second_value_white)
-                except (ValueError, TypeError):
-                    final_second_value_white = 0
-
-                x = initial_first_value_white / initial_second_value_white if initial_second_value_white != 0 else 0
-                y = final_first_value_white / final_second_value_white if final_second_value_white != 0 else 0
-
-                sum_values = ((y / x) * 100) - 100
-                if sum_values == -100:
-                    sum_values = 0
-
-                all_chart_data.append({
-                    'DUT': dut_name,
-                    'Initial Value': x,
-                    'Final Value': y,
-                })
-
-                st.write(f"DUT: {dut_name}")
-                st.write(f"Initial first value WhiteHomogeneity: {initial_first_value_white}")
-                st.write(f"Initial second value WhiteHomogeneity: {initial_second_value_white}")
-                st.write(f"Final first value WhiteHomogeneity: {final_first_value_white}")
-                st.write(f"Final second value WhiteHomogeneity: {final_second_value_white}")
-                st.write(f"Initial: {x}")
-                st.write(f"Final: {y}")
-
-                st.write(f"Deviation White Homogeneity(%): {sum_values}")
-                st.write("")  # Line break between entries
-
-            chart_df = pd.DataFrame(all_chart_data)
-
-            fig = go.Figure()
-            for col in chart_df.columns[1:]:
-                fig.add_trace(go.Bar(name=col, x=chart_df['DUT'], y=chart_df[col]))
-
-            fig.update_layout(barmode='group', xaxis_title='DUT', yaxis_title='Value', width=800, height=400)
+            show_metrics_table(metrics_view, {
+                'initial_first_value_white': "Initial first value WhiteHomogeneity",
+                'initial_second_value_white': "Initial second value WhiteHomogeneity",
+                'final_first_value_white': "Final first value WhiteHomogeneity",
+                'final_second_value_white': "Final second value WhiteHomogeneity",
+                'initial_homogeneity_white': "Initial",
+                'final_homogeneity_white': "Final",
+                'homogeneity_white_deviation': "Deviation White Homogeneity(%)"
+            }, diagnostics)
 
             st.write("<div style='display: flex; justify-content: center;'><h3>Homogeneity (White) Chart</h3></div>", unsafe_allow_html=True)
-            st.plotly_chart(fig)
+            show_section_charts(metrics_df, 'initial_homogeneity_white', 'final_homogeneity_white', 'homogeneity_white_deviation',
+                                large_campaign_threshold, top_n, diagnostics)
             st.write("")
 
-        if combined_data_first_second_value_black:          #---------------HOMOGENEITY BLACK CHART----------------#
+        if not metrics_df.empty:          #---------------HOMOGENEITY BLACK CHART----------------#
             st.subheader("Homogeneity (Black) Chart:")
 
-            all_chart_data = []
-
-            for dut_info in combined_data_first_second_value_black:
-                dut_name = dut_info['dut_name']
-                initial_first_value_black = dut_info['initial_first_value_black']
-                initial_second_value_black = dut_info['initial_second_value_black']
-                final_first_value_black = dut_info['final_first_value_black']
-                final_second_value_black = dut_info['final_second_value_black']
-
+            show_metrics_table(metrics_view, {
+                'initial_first_value_black': "Initial first value BlackHomogeneity",
+                'initial_second_value_black': "Initial second value BlackHomogeneity",
+                'final_first_value_black': "Final first value BlackHomogeneity",
+                'final_second_value_black': "Final second value BlackHomogeneity",
+                'initial_homogeneity_black': "Initial",
+                'final_homogeneity_black': "Final",
+                'homogeneity_black_deviation': "Deviation Black Homogeneity(%)"
+            }, diagnostics)
 
-                try:
-                    initial_first_value_black = float(initial_first_value_black)
-                except (ValueError, TypeError):
-                    initial_first_value_black = 0
-
-                try:
-                    initial_second_value_black = float(initial_second_value_black)
-                except (ValueError, TypeError):
-                    initial_second_value_black = 0
+            st.write("<div style='display: flex; justify-content: center;'><h3>Homogeneity (Black) Chart</h3></div>",
+                     unsafe_allow_html=True)
+            show_section_charts(metrics_df, 'initial_homogeneity_black', 'final_homogeneity_black', 'homogeneity_black_deviation',
+                                large_campaign_threshold, top_n, diagnostics)
+            st.write("")
 
-                try:
-                    final_first_value_black = float(final_first_value_black)
-                except (ValueError, TypeError):
-                    final_first_value_black = 0
+        if all_data and job is None:
+            show_archive(all_data)
 
-                try:
-                    final_second_value_black = float(final_second_value_black)
-                except (ValueError, TypeError):
-                    final_second_value_black = 0
+        page_record = diagnostics.finish()
+        if job is None:
+            log_record(page_record)
+        show_diagnostics(page_record)
+        poll_job(job)
 
-                x = initial_first_value_black / initial_second_value_black if initial_second_value_black != 0 else 0
-                y = final_first_value_black / final_second_value_black if final_second_value_black != 0 else 0
 
-                sum_values = ((y / x) * 100) - 100
-                if sum_values == -100:
-                    sum_values = 0
 
-                all_chart_data.append({
-                    'DUT': dut_name,
-                    'Initial Value': x,
-                    'Final Value': y,
-                })
+def page2():
+    st.title("Color")
 
-                st.write(f"DUT: {dut_name}")
-                st.write(f"Initial first value BlackHomogeneity: {initial_first_value_black}")
-                st.write(f"Initial second value BlackHomogeneity: {initial_second_value_black}")
-                st.write(f"Final first value BlackHomogeneity: {final_first_value_black}")
-                st.write(f"Final second value BlackHomogeneity: {final_second_value_black}")
-                st.write(f"Initial: {x}")
-                st.write(f"Final: {y}")
+    col1, col2 = st.columns(2)
 
-                st.write(f"Deviation Black Homogeneity(%): {sum_values}")
-                st.write("")  # Line break between entries
+    with col1:
+        st.write("Drag and drop report files (xls, xlsx, csv, parquet) for **'Initial'** here:")
+        initial_uploaded_files = st.file_uploader("", type=upload_types, accept_multiple_files=True,
+                                                  key="initial_color_file_uploader")
 
-            chart_df = pd.DataFrame(all_chart_data)
+    with col2:
+        st.write("Drag and drop report files (xls, xlsx, csv, parquet) for **'Final'** here:")
+        final_uploaded_files = st.file_uploader("", type=upload_types, accept_multiple_files=True,
+                                                key="final_color_file_uploader")
 
-            fig = go.Figure()
-            for col in chart_df.columns[1:]:
-                fig.add_trace(go.Bar(name=col, x=chart_df['DUT'], y=chart_df[col]))
+    max_workers, large_campaign_threshold, top_n = sidebar_settings()
+    cache = get_result_cache()
 
-            fig.update_layout(barmode='group', xaxis_title='DUT', yaxis_title='Value', width=800, height=400)
+    if initial_uploaded_files or final_uploaded_files:
+        diagnostics = Diagnostics(page="Color")
+
+        with diagnostics.stage("process"):
+            initial_data, final_data, job = process_uploads({initial_folder: initial_uploaded_files or [],
+                                                             final_folder: final_uploaded_files or []},
+                                                            max_workers, cache, "color")
+        show_progress(job)
+
+        st.sidebar.caption(f"Cache: {cache.hits} hits / {cache.misses} misses")
+
+        with diagnostics.stage("pair_metrics"):
+            unmatched_initial, unmatched_final, metrics_df, summary_df = color_metrics(initial_data, final_data)
+
+        without_points = [info['file_name'] for info in initial_data + final_data if not info['color_points']['spotmeter']]
+        if without_points:
+            st.warning(f"Nu s-au găsit coordonate x/y sau u'/v' în: {', '.join(without_points)}")
+
+        if job is None and initial_data and final_data and (unmatched_initial or unmatched_final):
+            if unmatched_initial:
+                st.warning(f"DUT-uri fără pereche în 'Final': {', '.join(unmatched_initial)}")
+            if unmatched_final:
+                st.warning(f"DUT-uri fără pereche în 'Initial': {', '.join(unmatched_final)}")
+
+        if not summary_df.empty:        #---------------COLOR SHIFT PER DUT----------------#
+            st.subheader("Color Shift per DUT:")
+
+            with diagnostics.stage("tables"):
+                st.dataframe(summary_df.rename(columns={
+                    'dut_name': "DUT",
+                    'points': "Measurement points",
+                    'max_delta_uv': "Max Δu'v'",
+                    'mean_delta_uv': "Mean Δu'v'",
+                    'max_delta_e': "Max ΔE*uv",
+                    'mean_delta_e': "Mean ΔE*uv"
+                }), hide_index=True)
+
+            with diagnostics.stage("charts"):
+                st.write("<div style='display: flex; justify-content: center;'><h3>Δu'v' Chart</h3></div>", unsafe_allow_html=True)
+                for fig in color_figures(summary_df, 'max_delta_uv', "Max Δu'v'", large_campaign_threshold, top_n):
+                    st.plotly_chart(fig)
+
+                st.write("<div style='display: flex; justify-content: center;'><h3>ΔE Chart</h3></div>", unsafe_allow_html=True)
+                for fig in color_figures(summary_df, 'max_delta_e', "Max ΔE*uv", large_campaign_threshold, top_n):
+                    st.plotly_chart(fig)
+            st.write("")
 
-            st.write("<div style='display: flex; justify-content: center;'><h3>Homogeneity (Black) Chart</h3></div>",
-                     unsafe_allow_html=True)
-            st.plotly_chart(fig)
+        if not metrics_df.empty:        #---------------COLOR SHIFT PER POINT----------------#
+            st.subheader("Color Shift per Measurement Point:")
+
+            dut_filter = st.text_input("Filtru DUT", key="color_dut_filter")
+            points_view = metrics_df
+            if dut_filter:
+                points_view = metrics_df[metrics_df['dut_name'].str.contains(dut_filter, case=False, regex=False)]
+
+            with diagnostics.stage("tables"):
+                st.dataframe(points_view[['dut_name', 'spotmeter', 'measurement',
+                                          'initial_u_prime', 'initial_v_prime', 'final_u_prime', 'final_v_prime',
+                                          'initial_luminance', 'final_luminance', 'delta_uv', 'delta_e']].rename(columns={
+                    'dut_name': "DUT",
+                    'spotmeter': "Spotmeter",
+                    'measurement': "Measurement",
+                    'initial_u_prime': "Initial u'",
+                    'initial_v_prime': "Initial v'",
+                    'final_u_prime': "Final u'",
+                    'final_v_prime': "Final v'",
+                    'initial_luminance': "Initial luminance",
+                    'final_luminance': "Final luminance",
+                    'delta_uv': "Δu'v'",
+                    'delta_e': "ΔE*uv"
+                }), hide_index=True)
+
+            with diagnostics.stage("charts"):
+                st.write("<div style='display: flex; justify-content: center;'><h3>Chromaticity Drift</h3></div>", unsafe_allow_html=True)
+                st.plotly_chart(color_drift_figure(metrics_df))
             st.write("")
 
+        page_record = diagnostics.finish()
+        if job is None:
+            log_record(page_record)
+        show_diagnostics(page_record, "color")
+        poll_job(job)
 
 
 def main():
@@ -500,7 +605,7 @@ def main():
     if page == "Black and White":
         page1()
     elif page == "Color":
-        st.write("pagina 2")
+        page2()
 
 
 if __name__ == "__main__":
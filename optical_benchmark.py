@@ -0,0 +1,232 @@
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from optical_charts import build_section_figures
+from optical_cli import read_files
+from optical_metrics import campaign_summary, compute_metrics
+from optical_processing import (extract_dut_info, extract_measurements, final_folder, initial_folder,
+                                iter_process_files, normalize_markers, pair_duts, parquet_frame, process_file,
+                                read_csv_file, read_excel_file, read_parquet_file, remove_empty_rows_from_df,
+                                stream_dut_values)
+
+chart_sections = [
+    ("initial_spotmeter_white", "final_spotmeter_white", "white_deviation"),
+    ("initial_spotmeter_black", "final_spotmeter_black", "black_deviation"),
+    ("initial_contrast", "final_contrast", "contrast_deviation"),
+    ("initial_homogeneity_white", "final_homogeneity_white", "homogeneity_white_deviation"),
+    ("initial_homogeneity_black", "final_homogeneity_black", "homogeneity_black_deviation")
+]
+
+
+def generate_report(rows, seed=0):
+    # Same layout the parser expects: a header row, filler measurement rows, then per colour the
+    # Spotmeter #001..#009 block followed by two "<Colour> Homogeneity" rows (values in columns 4 and 5).
+    rnd = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Measurement report", None, None, None, None, None])
+
+    for colour in ("White", "Black"):
+        sheet.append([colour, None, None, None, None, None])
+        for _ in range(rows // 2):
+            sheet.append([None, "Data", rnd.random(), rnd.random(), rnd.random(), rnd.random()])
+        sheet.append([])
+        for spotmeter in range(1, 10):
+            sheet.append([None, f"Spotmeter #{spotmeter:03d}", None, None, rnd.uniform(1, 500), None])
+        sheet.append([None, f"{colour} Homogeneity", None, None, rnd.uniform(50, 100), rnd.uniform(0.5, 1)])
+        sheet.append([None, f"{colour} Homogeneity", None, None, "ok", "ok"])
+
+    content = io.BytesIO()
+    workbook.save(content)
+    return content.getvalue()
+
+
+def generate_dut_records(duts, folder_type, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(0.5, 500, size=(duts, 6))
+    return [{
+        "file_name": f"DUT_{i:06d}.xlsx",
+        "initial_final": folder_type,
+        "spotmeter_white_homogeneity": values[i, 0],
+        "white_homogeneity_values": (values[i, 1], values[i, 2]),
+        "spotmeter_black_homogeneity": values[i, 3],
+        "black_homogeneity_values": (values[i, 4], values[i, 5])
+    } for i in range(duts)]
+
+
+class StageTimer:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.stages = {}
+
+    def run(self, stage, fn, *args):
+        # fn runs twice when memory is traced, so stages reading a buffer pass a factory that opens a fresh one.
+        start = time.perf_counter()
+        result = fn(*args)
+        seconds = time.perf_counter() - start
+
+        peak_bytes = None
+        if self.trace_memory:
+            # Separate traced run: tracemalloc overhead would otherwise distort the timing.
+            tracemalloc.start()
+            fn(*args)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        record = self.stages.setdefault(stage, {"seconds": 0.0, "peak_bytes": None, "calls": 0})
+        record["seconds"] += seconds
+        record["calls"] += 1
+        if peak_bytes is not None:
+            record["peak_bytes"] = max(record["peak_bytes"] or 0, peak_bytes)
+        return result
+
+
+def run_benchmark(rows, files, duts, workers, trace_memory=True, seed=0):
+    timer = StageTimer(trace_memory)
+    reports = [generate_report(rows, seed + i) for i in range(files)]
+
+    for i, content in enumerate(reports):
+        df = timer.run("read", lambda: read_excel_file(io.BytesIO(content)))
+        cleaned_df = timer.run("clean", remove_empty_rows_from_df, df)
+        normalized_df = timer.run("normalize", normalize_markers, cleaned_df)
+        timer.run("extract", extract_dut_info, normalized_df, f"DUT_{i:06d}.xlsx", initial_folder)
+        timer.run("extract_all", extract_measurements, normalized_df)
+        timer.run("stream_extract", lambda: stream_dut_values(io.BytesIO(content)))
+
+        # The same report as the CSV/Parquet exports the fast readers take.
+        csv_content = df.to_csv(index=False).encode()
+        parquet_buffer = io.BytesIO()
+        parquet_frame(df).to_parquet(parquet_buffer, index=False)
+        parquet_content = parquet_buffer.getvalue()
+        timer.run("read_csv", lambda: read_csv_file(io.BytesIO(csv_content)))
+        timer.run("read_parquet", lambda: read_parquet_file(io.BytesIO(parquet_content)))
+
+    named_reports = [(f"DUT_{i:06d}.xlsx", content) for i, content in enumerate(reports)]
+    timer.run("process_files", lambda: list(iter_process_files(named_reports, initial_folder, workers)))
+
+    initial_data = generate_dut_records(duts, initial_folder, seed)
+    final_data = generate_dut_records(duts, final_folder, seed + 1)
+    paired_df, _, _ = timer.run("pair", pair_duts, initial_data, final_data)
+    metrics_df = timer.run("metrics", compute_metrics, paired_df)
+    timer.run("summary", campaign_summary, metrics_df)
+    timer.run("render_prep", lambda: [build_section_figures(metrics_df, *section) for section in chart_sections])
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "config": {"rows": rows, "files": files, "duts": duts, "workers": workers, "seed": seed},
+        "stages": timer.stages
+    }
+
+
+def traced_peak(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def memory_benchmark(rows, files, seed=0, bound_ratio=1.5):
+    # Reports are written to disk first and read back inside each traced run, the way the CLI reads them:
+    # the eager run holds every file at once, the streaming run only the one being parsed. Streaming counts
+    # as bounded when its peak over all files stays within bound_ratio of the peak for a single file.
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(files):
+            paths.append(os.path.join(directory, f"DUT_{i:06d}.xlsx"))
+            with open(paths[-1], "wb") as f:
+                f.write(generate_report(rows, seed + i))
+
+        single_peak = traced_peak(lambda: process_file(*next(read_files(paths)), initial_folder))
+        eager_peak = traced_peak(lambda: [process_file(file_name, content, initial_folder)
+                                          for file_name, content in list(read_files(paths))])
+        streaming_peak = traced_peak(lambda: list(iter_process_files(read_files(paths), initial_folder)))
+
+    return {
+        "rows": rows,
+        "files": files,
+        "single_file_peak_bytes": single_peak,
+        "eager_peak_bytes": eager_peak,
+        "streaming_peak_bytes": streaming_peak,
+        "bounded": streaming_peak <= single_peak * bound_ratio
+    }
+
+
+def compare_results(previous, current, tolerance):
+    regressions = []
+    for stage, record in current["stages"].items():
+        baseline = previous.get("stages", {}).get(stage)
+        if not baseline or not baseline["seconds"]:
+            continue
+        ratio = record["seconds"] / baseline["seconds"]
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{stage:>15}: {baseline['seconds']:.4f}s -> {record['seconds']:.4f}s ({ratio:.2f}x) {flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Time each stage of the optical report pipeline on synthetic data.")
+    parser.add_argument("--rows", type=int, default=5000, help="filler rows per generated report (default: 5000)")
+    parser.add_argument("--files", type=int, default=4, help="generated reports to parse (default: 4)")
+    parser.add_argument("--duts", type=int, default=10000, help="DUTs per side for pair/metrics/render (default: 10000)")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="worker processes for process_files (default: 1)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory runs")
+    parser.add_argument("--memory-files", type=int, default=0,
+                        help="also compare eager vs streaming peak memory over this many reports; exits 1 if "
+                             "streaming is not bounded by one file (default: 0, off)")
+    parser.add_argument("-o", "--output", default="optical_benchmark.json", help="JSON results file")
+    parser.add_argument("--compare", help="earlier results file; exits 1 if a stage got slower than --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown ratio (default: 0.25)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmark(args.rows, args.files, args.duts, args.workers, not args.no_memory)
+    if args.memory_files:
+        results["memory"] = memory_benchmark(args.rows, args.memory_files)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for stage, record in results["stages"].items():
+        peak = f"{record['peak_bytes'] / 2 ** 20:.1f} MiB peak" if record["peak_bytes"] is not None else ""
+        print(f"{stage:>15}: {record['seconds']:.4f}s over {record['calls']} call(s) {peak}")
+
+    memory = results.get("memory")
+    if memory:
+        print(f"{'memory':>15}: {memory['files']} files, one file {memory['single_file_peak_bytes'] / 2 ** 20:.1f} MiB, "
+              f"eager {memory['eager_peak_bytes'] / 2 ** 20:.1f} MiB, "
+              f"streaming {memory['streaming_peak_bytes'] / 2 ** 20:.1f} MiB"
+              f"{'' if memory['bounded'] else ' NOT BOUNDED'}")
+        if not memory["bounded"]:
+            return 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if compare_results(previous, results, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
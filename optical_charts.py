@@ -0,0 +1,88 @@
+import plotly.graph_objs as go
+
+default_large_campaign_threshold = 200
+default_top_n = 25
+
+
+def build_bar_chart(metrics_df, initial_column, final_column):
+    fig = go.Figure(data=[
+        go.Bar(name='Initial Value', x=metrics_df['dut_name'], y=metrics_df[initial_column]),
+        go.Bar(name='Final Value', x=metrics_df['dut_name'], y=metrics_df[final_column])
+    ])
+
+    fig.update_layout(barmode='group', xaxis_title='DUT', yaxis_title='Value', width=800, height=400)
+    return fig
+
+
+def build_deviation_histogram(metrics_df, deviation_column, value_title='Deviation (%)'):
+    fig = go.Figure(data=[go.Histogram(x=metrics_df[deviation_column].dropna(), nbinsx=50, name='DUTs')])
+
+    fig.update_layout(title=f'{value_title} distribution', xaxis_title=value_title, yaxis_title='DUT count',
+                      width=800, height=400)
+    return fig
+
+
+def build_worst_duts_chart(metrics_df, deviation_column, top_n, value_title='Deviation (%)'):
+    worst_df = metrics_df.loc[metrics_df[deviation_column].abs().nlargest(top_n).index]
+    fig = go.Figure(data=[go.Bar(name=value_title, x=worst_df['dut_name'], y=worst_df[deviation_column])])
+
+    fig.update_layout(title=f'Top {len(worst_df)} DUTs by absolute {value_title}', xaxis_title='DUT',
+                      yaxis_title=value_title, width=800, height=400)
+    return fig
+
+
+def build_initial_final_scatter(metrics_df, initial_column, final_column):
+    values = metrics_df[[initial_column, final_column]]
+    low, high = values.min().min(), values.max().max()
+
+    # WebGL keeps thousands of markers responsive; the diagonal marks "no change".
+    fig = go.Figure(data=[
+        go.Scattergl(name='DUT', x=metrics_df[initial_column], y=metrics_df[final_column],
+                     text=metrics_df['dut_name'], mode='markers', marker=dict(size=5)),
+        go.Scattergl(name='Initial = Final', x=[low, high], y=[low, high], mode='lines',
+                     line=dict(dash='dash', color='grey'))
+    ])
+
+    fig.update_layout(title='Initial vs Final', xaxis_title='Initial Value', yaxis_title='Final Value',
+                      width=800, height=400)
+    return fig
+
+
+def build_section_figures(metrics_df, initial_column, final_column, deviation_column,
+                          large_campaign_threshold=default_large_campaign_threshold, top_n=default_top_n):
+    if len(metrics_df) <= large_campaign_threshold:
+        return [build_bar_chart(metrics_df, initial_column, final_column)]
+
+    return [
+        build_deviation_histogram(metrics_df, deviation_column),
+        build_worst_duts_chart(metrics_df, deviation_column, top_n),
+        build_initial_final_scatter(metrics_df, initial_column, final_column)
+    ]
+
+
+def build_color_drift_chart(color_metrics_df):
+    # One marker per measurement point in u'v'; the Initial -> Final shift shows as the gap between the two clouds.
+    hover_text = color_metrics_df['dut_name'] + ' ' + color_metrics_df['spotmeter']
+    fig = go.Figure(data=[
+        go.Scattergl(name='Initial', x=color_metrics_df['initial_u_prime'], y=color_metrics_df['initial_v_prime'],
+                     text=hover_text, mode='markers', marker=dict(size=5)),
+        go.Scattergl(name='Final', x=color_metrics_df['final_u_prime'], y=color_metrics_df['final_v_prime'],
+                     text=hover_text, mode='markers', marker=dict(size=5))
+    ])
+
+    fig.update_layout(title="Chromaticity drift (CIE 1976 u'v')", xaxis_title="u'", yaxis_title="v'",
+                      width=800, height=400)
+    return fig
+
+
+def build_color_figures(summary_df, value_column, value_title,
+                        large_campaign_threshold=default_large_campaign_threshold, top_n=default_top_n):
+    if len(summary_df) <= large_campaign_threshold:
+        fig = go.Figure(data=[go.Bar(name=value_title, x=summary_df['dut_name'], y=summary_df[value_column])])
+        fig.update_layout(xaxis_title='DUT', yaxis_title=value_title, width=800, height=400)
+        return [fig]
+
+    return [
+        build_deviation_histogram(summary_df, value_column, value_title),
+        build_worst_duts_chart(summary_df, value_column, top_n, value_title)
+    ]
@@ -0,0 +1,139 @@
+import argparse
+import glob
+import os
+import sys
+from datetime import date
+
+from optical_cache import ResultCache
+from optical_diagnostics import configure_log
+from optical_metrics import campaign_summary, compute_metrics, deviation_columns
+from optical_processing import (default_extraction_spec, default_max_workers, final_folder, initial_folder,
+                                is_report_file, iter_process_files, measurements_frame, pair_duts)
+from optical_store import MeasurementStore
+
+
+def collect_files(source, accept=is_report_file):
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in sorted(os.listdir(source))]
+    else:
+        paths = sorted(glob.glob(source))
+    return [path for path in paths if os.path.isfile(path) and accept(path)]
+
+
+def read_files(paths):
+    # Lazy, so only the reports currently being parsed are held in memory.
+    for path in paths:
+        with open(path, "rb") as f:
+            yield os.path.basename(path), f.read()
+
+
+def process_source(source, folder_type, max_workers, cache, kind="black_white", spec=None):
+    paths = collect_files(source)
+    data = []
+    failed = 0
+
+    results = iter_process_files(read_files(paths), folder_type, max_workers, cache, kind, spec)
+    for path, (info, error, _) in zip(paths, results):
+        if error is not None:
+            print(f"Nu s-a putut citi fișierul {os.path.basename(path)}: {error}", file=sys.stderr)
+            failed += 1
+        else:
+            data.append(info)
+
+    print(f"{folder_type}: {len(data)} of {len(paths)} files processed from {source}", file=sys.stderr)
+    return data, failed
+
+
+def write_table(df, output):
+    if output.lower().endswith(".parquet"):
+        df.to_parquet(output, index=False)
+    else:
+        df.to_csv(output, index=False)
+
+
+def extraction_spec(args):
+    spec = dict(default_extraction_spec, sheets=args.sheets)
+    if args.spotmeters:
+        spec["spotmeters"] = [f"Spotmeter #{spotmeter:03d}" for spotmeter in args.spotmeters]
+    if args.markers:
+        spec["markers"] = args.markers
+    return spec
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pair Initial/Final measurement reports and write the DUT metrics table.")
+    parser.add_argument("--initial", default=initial_folder,
+                        help=f"directory or glob pattern of 'Initial' reports (default: {initial_folder})")
+    parser.add_argument("--final", default=final_folder,
+                        help=f"directory or glob pattern of 'Final' reports (default: {final_folder})")
+    parser.add_argument("-o", "--output", default="optical_metrics.csv",
+                        help="output file, written as Parquet when it ends in .parquet and as CSV otherwise")
+    parser.add_argument("-j", "--workers", type=int, default=default_max_workers,
+                        help=f"parallel worker processes (default: {default_max_workers})")
+    parser.add_argument("--cache-dir", help="reuse parsed results stored in this directory between runs")
+    parser.add_argument("--store", help="also append the parsed DUT records to this SQLite measurement store")
+    parser.add_argument("--campaign", help="campaign name for --store (default: today's date)")
+    parser.add_argument("--measurements",
+                        help="also write every requested spotmeter/marker measurement of every sheet as a long table "
+                             "(Parquet when it ends in .parquet, CSV otherwise)")
+    parser.add_argument("--spotmeters", type=int, nargs="+",
+                        help="spotmeter numbers for --measurements (default: 1 to 9)")
+    parser.add_argument("--markers", nargs="+",
+                        help="marker names for --measurements (default: WhiteHomogeneity BlackHomogeneity)")
+    parser.add_argument("--sheets", nargs="+", help="sheet names for --measurements (default: all sheets)")
+    parser.add_argument("--summary", help="also write the per-metric campaign summary table to this file")
+    parser.add_argument("--failures", help="also write the outlier / over-limit DUT list to this file")
+    parser.add_argument("--limit", type=float,
+                        help="pass/fail limit on the absolute deviation (%%) of every metric for --summary/--failures")
+    parser.add_argument("--diagnostics-log", help="write per-file stage timings as JSON lines to this file ('-' for stderr)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_log(args.diagnostics_log)
+    cache = ResultCache(cache_dir=args.cache_dir) if args.cache_dir else None
+
+    # With --measurements each report is read once for both its B/W record and its measurements.
+    kind, spec = ("measurements", extraction_spec(args)) if args.measurements else ("black_white", None)
+    initial_data, initial_failed = process_source(args.initial, initial_folder, args.workers, cache, kind, spec)
+    final_data, final_failed = process_source(args.final, final_folder, args.workers, cache, kind, spec)
+
+    paired_df, unmatched_initial, unmatched_final = pair_duts(initial_data, final_data)
+    if unmatched_initial:
+        print(f"DUT-uri fără pereche în 'Final': {', '.join(unmatched_initial)}", file=sys.stderr)
+    if unmatched_final:
+        print(f"DUT-uri fără pereche în 'Initial': {', '.join(unmatched_final)}", file=sys.stderr)
+
+    if args.store:
+        campaign = args.campaign or date.today().isoformat()
+        saved = MeasurementStore(args.store).append(initial_data + final_data, campaign)
+        print(f"{saved} DUT records stored in campaign '{campaign}' ({args.store})", file=sys.stderr)
+
+    metrics_df = compute_metrics(paired_df)
+    outputs = [(metrics_df, args.output)]
+    if args.measurements:
+        measurements_df = measurements_frame(initial_data + final_data)
+        outputs.append((measurements_df, args.measurements))
+    if args.summary or args.failures:
+        summary_df, failures_df = campaign_summary(metrics_df, {column: args.limit for column in deviation_columns})
+        outputs.extend((df, output) for df, output in ((summary_df, args.summary), (failures_df, args.failures))
+                       if output)
+
+    for df, output in outputs:
+        try:
+            write_table(df, output)
+        except (ImportError, OSError) as e:
+            print(f"Nu s-a putut scrie fișierul {output}: {e}", file=sys.stderr)
+            return 2
+
+    print(f"{len(metrics_df)} paired DUTs written to {args.output}", file=sys.stderr)
+    if args.measurements:
+        print(f"{len(measurements_df)} measurements written to {args.measurements}", file=sys.stderr)
+    if args.failures:
+        print(f"{failures_df['dut_name'].nunique()} flagged DUTs written to {args.failures}", file=sys.stderr)
+    return 1 if initial_failed or final_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
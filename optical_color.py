@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+from optical_cache import dut_key
+
+# Column labels looked for in the label row above each block of spotmeter rows (exact match after stripping).
+# Single letters are case-sensitive so a "Y" luminance column is never taken for the CIE y coordinate.
+chromaticity_labels = {
+    "x": {"x", "CIE x", "CIE-x", "cx", "Cx"},
+    "y": {"y", "CIE y", "CIE-y", "cy", "Cy"},
+    "u_prime": {"u'", "u’", "u`", "CIE u'", "u prime"},
+    "v_prime": {"v'", "v’", "v`", "CIE v'", "v prime"},
+    "luminance": {"Lv", "LV", "L", "Y", "Luminance", "luminance", "cd/m2", "cd/m²"}
+}
+
+# D65 white point in CIE 1976 u'v', the reference for the CIELUV colour difference.
+white_u_prime = 0.1978
+white_v_prime = 0.4683
+
+point_columns = ["spotmeter", "measurement", "x", "y", "u_prime", "v_prime", "luminance"]
+
+
+def label_positions(text_values, labels):
+    # Column position of the first cell in each row whose text is one of the labels, -1 if there is none.
+    matches = np.isin(text_values, list(labels))
+    return np.where(matches.any(axis=1), matches.argmax(axis=1), -1)
+
+
+def extract_color_points(df, labels=None):
+    labels = labels or chromaticity_labels
+    values = df.to_numpy(dtype=object)
+    if values.size == 0:
+        return pd.DataFrame(columns=point_columns)
+
+    text_df = df.astype(str).apply(lambda column: column.str.strip())
+    text_values = text_df.to_numpy()
+
+    # read_excel (and a CSV header line) turns a label row at the top of the sheet into the column names, so the
+    # header is a candidate label row in front of row 0. Label rows are numbered from the header on.
+    header_values = np.array([str(column).strip() for column in df.columns], dtype=object)
+    label_text_values = np.vstack([header_values, text_values])
+    positions = {name: label_positions(label_text_values, aliases) for name, aliases in labels.items()}
+    is_label_row = (((positions["x"] >= 0) & (positions["y"] >= 0))
+                    | ((positions["u_prime"] >= 0) & (positions["v_prime"] >= 0)))
+
+    spotmeter_matches = text_df.apply(lambda column: column.str.fullmatch(r"(?i)spotmeter\s*#\s*\d+")).to_numpy()
+    is_spotmeter_row = spotmeter_matches.any(axis=1) & ~is_label_row[1:]
+
+    # Every spotmeter row takes its column layout from the closest label row above it.
+    row_numbers = np.arange(len(df))
+    label_row = np.maximum.accumulate(np.where(is_label_row, np.arange(len(df) + 1), -1))[1:]
+    rows = row_numbers[is_spotmeter_row & (label_row >= 0)]
+    if len(rows) == 0:
+        return pd.DataFrame(columns=point_columns)
+    layout_rows = label_row[rows]
+
+    points_df = pd.DataFrame({
+        "spotmeter": text_values[rows, spotmeter_matches[rows].argmax(axis=1)]
+    })
+    points_df["spotmeter"] = points_df["spotmeter"].str.replace(r"\s+", " ", regex=True)
+    points_df["measurement"] = points_df.groupby("spotmeter").cumcount()
+
+    # Without a labelled luminance column the luminance stays NaN, and so does ΔE*uv; no column is guessed.
+    for name in ("x", "y", "u_prime", "v_prime", "luminance"):
+        columns = positions[name][layout_rows]
+        picked = values[rows, np.maximum(columns, 0)]
+        points_df[name] = pd.to_numeric(pd.Series(np.where(columns >= 0, picked, np.nan)), errors="coerce")
+
+    return points_df
+
+
+def extract_color_info(df, file_name, folder_type):
+    return {
+        "file_name": file_name,
+        "initial_final": folder_type,
+        "color_points": extract_color_points(df).to_dict("list")
+    }
+
+
+def color_points_frame(data):
+    frames = [pd.DataFrame(info["color_points"], columns=point_columns).assign(dut_name=dut_key(info["file_name"]))
+              for info in data]
+    if not frames:
+        return pd.DataFrame(columns=["dut_name"] + point_columns)
+    return pd.concat(frames, ignore_index=True)[["dut_name"] + point_columns]
+
+
+def pair_color_points(initial_data, final_data):
+    initial_df = color_points_frame(initial_data)
+    final_df = color_points_frame(final_data)
+    keys = ["dut_name", "spotmeter", "measurement"]
+
+    value_columns = [column for column in point_columns if column not in keys]
+    paired_df = initial_df.merge(final_df, on=keys, how="inner", suffixes=("_initial", "_final"))
+    paired_df = paired_df.rename(columns={f"{column}_{side}": f"{side}_{column}"
+                                          for column in value_columns for side in ("initial", "final")})
+
+    initial_names = set(initial_df["dut_name"])
+    final_names = set(final_df["dut_name"])
+    unmatched_initial = [name for name in dict.fromkeys(initial_df["dut_name"]) if name not in final_names]
+    unmatched_final = [name for name in dict.fromkeys(final_df["dut_name"]) if name not in initial_names]
+    return paired_df, unmatched_initial, unmatched_final
+
+
+def uv_from_xy(x, y):
+    denominator = -2 * x + 12 * y + 3
+    denominator = denominator.where(denominator != 0)
+    return 4 * x / denominator, 9 * y / denominator
+
+
+def lightness(luminance, reference_luminance):
+    ratio = luminance / reference_luminance.where(reference_luminance > 0)
+    return np.where(ratio > (6 / 29) ** 3, 116 * np.cbrt(ratio) - 16, (29 / 3) ** 3 * ratio)
+
+
+def compute_color_metrics(paired_df):
+    metrics_df = paired_df.copy()
+
+    for side in ("initial", "final"):
+        u_from_xy, v_from_xy = uv_from_xy(metrics_df[f"{side}_x"].astype(float), metrics_df[f"{side}_y"].astype(float))
+        # Reported u'v' wins; x/y is only converted where u'v' was not measured.
+        metrics_df[f"{side}_u_prime"] = metrics_df[f"{side}_u_prime"].astype(float).fillna(u_from_xy)
+        metrics_df[f"{side}_v_prime"] = metrics_df[f"{side}_v_prime"].astype(float).fillna(v_from_xy)
+
+    delta_u = metrics_df["final_u_prime"] - metrics_df["initial_u_prime"]
+    delta_v = metrics_df["final_v_prime"] - metrics_df["initial_v_prime"]
+    metrics_df["delta_uv"] = np.hypot(delta_u, delta_v)
+
+    # CIELUV ΔE*uv with the Initial luminance of the same point as reference white (Initial L* = 100).
+    initial_luminance = metrics_df["initial_luminance"].astype(float)
+    initial_l = lightness(initial_luminance, initial_luminance)
+    final_l = lightness(metrics_df["final_luminance"].astype(float), initial_luminance)
+    delta_u_star = 13 * (final_l * (metrics_df["final_u_prime"] - white_u_prime)
+                         - initial_l * (metrics_df["initial_u_prime"] - white_u_prime))
+    delta_v_star = 13 * (final_l * (metrics_df["final_v_prime"] - white_v_prime)
+                         - initial_l * (metrics_df["initial_v_prime"] - white_v_prime))
+    metrics_df["delta_e"] = np.sqrt((final_l - initial_l) ** 2 + delta_u_star ** 2 + delta_v_star ** 2)
+
+    return metrics_df
+
+
+def color_dut_summary(metrics_df):
+    summary_df = metrics_df.groupby("dut_name", sort=False).agg(
+        points=("delta_uv", "size"),
+        max_delta_uv=("delta_uv", "max"),
+        mean_delta_uv=("delta_uv", "mean"),
+        max_delta_e=("delta_e", "max"),
+        mean_delta_e=("delta_e", "mean")
+    )
+    return summary_df.reset_index()
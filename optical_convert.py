@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from optical_cli import collect_files
+from optical_processing import default_max_workers, is_excel_file, parquet_frame, read_excel_file
+
+
+def target_path(path, output_dir):
+    return os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0] + ".parquet")
+
+
+def convert_workbook(path, target):
+    try:
+        parquet_frame(read_excel_file(path)).to_parquet(target, index=False)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Convert an archive of xls/xlsx reports to Parquet once, "
+                                                 "so later runs read them without openpyxl.")
+    parser.add_argument("source", help="directory or glob pattern of xls/xlsx reports")
+    parser.add_argument("-o", "--output-dir", required=True, help="directory the .parquet files are written to")
+    parser.add_argument("-j", "--workers", type=int, default=default_max_workers,
+                        help=f"parallel worker processes (default: {default_max_workers})")
+    parser.add_argument("--force", action="store_true", help="also convert reports whose Parquet file is up to date")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    paths = collect_files(args.source, is_excel_file)
+    # A report is skipped when its Parquet file is newer, so re-running only converts new or changed reports.
+    pending = [(path, target_path(path, args.output_dir)) for path in paths]
+    pending = [(path, target) for path, target in pending
+               if args.force or not os.path.exists(target) or os.path.getmtime(target) < os.path.getmtime(path)]
+
+    sources = [path for path, _ in pending]
+    targets = [target for _, target in pending]
+    failed = 0
+    if pending:
+        with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(pending)))) as executor:
+            for path, error in zip(sources, executor.map(convert_workbook, sources, targets)):
+                if error is not None:
+                    print(f"Nu s-a putut converti fișierul {os.path.basename(path)}: {error}", file=sys.stderr)
+                    failed += 1
+
+    print(f"{len(pending) - failed} of {len(paths)} reports converted to {args.output_dir} "
+          f"({len(paths) - len(pending)} already up to date)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
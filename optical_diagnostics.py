@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module; memory is then reported as None.
+    resource = None
+
+logger = logging.getLogger("optical_tool.diagnostics")
+
+
+def process_peak_rss_bytes():
+    # High-water mark of the whole process since it started, so it never goes down between records.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def current_rss_bytes():
+    # Resident memory right now, read from /proc on Linux; None where that is not available.
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class Diagnostics:
+    # Only perf_counter calls, two /proc reads per stage and one getrusage per record, so it stays on in production.
+    def __init__(self, **fields):
+        self.record = dict(fields, stages={}, stage_rss_delta_bytes={})
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        start_rss = current_rss_bytes()
+        try:
+            yield
+        finally:
+            self.record["stages"][name] = self.record["stages"].get(name, 0.0) + time.perf_counter() - start
+            # How much resident memory the stage added (negative when it freed more than it took).
+            end_rss = current_rss_bytes()
+            if start_rss is not None and end_rss is not None:
+                deltas = self.record["stage_rss_delta_bytes"]
+                deltas[name] = deltas.get(name, 0) + end_rss - start_rss
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+    def finish(self):
+        self.record["total_seconds"] = sum(self.record["stages"].values())
+        self.record["rss_bytes"] = current_rss_bytes()
+        self.record["process_peak_rss_bytes"] = process_peak_rss_bytes()
+        return self.record
+
+
+def configure_log(path):
+    # "-" logs JSON lines to stderr, any other value is a file path, an empty value disables logging.
+    if not path or logger.handlers:
+        return
+
+    handler = logging.StreamHandler(sys.stderr) if path == "-" else logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def log_record(record):
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(record, default=str))
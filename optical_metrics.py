@@ -0,0 +1,119 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+value_columns = [
+    "initial_spotmeter_white", "final_spotmeter_white",
+    "initial_spotmeter_black", "final_spotmeter_black",
+    "initial_first_value_white", "initial_second_value_white",
+    "final_first_value_white", "final_second_value_white",
+    "initial_first_value_black", "initial_second_value_black",
+    "final_first_value_black", "final_second_value_black"
+]
+
+
+def ratio(numerator, denominator):
+    # A zero or missing denominator gives NaN rather than inf or a substituted 0.
+    return (numerator / denominator.where(denominator != 0)).replace([np.inf, -np.inf], np.nan)
+
+
+def deviation(initial, final):
+    return ratio(final, initial) * 100 - 100
+
+
+def compute_metrics(paired_df):
+    values = paired_df.reindex(columns=value_columns).apply(pd.to_numeric, errors="coerce").astype(float)
+    metrics_df = pd.concat([paired_df[["dut_name"]], values], axis=1)
+
+    metrics_df["white_deviation"] = deviation(values["initial_spotmeter_white"], values["final_spotmeter_white"])
+    metrics_df["black_deviation"] = deviation(values["initial_spotmeter_black"], values["final_spotmeter_black"])
+
+    metrics_df["initial_contrast"] = ratio(values["initial_spotmeter_white"], values["initial_spotmeter_black"])
+    metrics_df["final_contrast"] = ratio(values["final_spotmeter_white"], values["final_spotmeter_black"])
+    metrics_df["contrast_deviation"] = deviation(metrics_df["initial_contrast"], metrics_df["final_contrast"])
+
+    for colour in ("white", "black"):
+        initial = ratio(values[f"initial_first_value_{colour}"], values[f"initial_second_value_{colour}"])
+        final = ratio(values[f"final_first_value_{colour}"], values[f"final_second_value_{colour}"])
+        metrics_df[f"initial_homogeneity_{colour}"] = initial
+        metrics_df[f"final_homogeneity_{colour}"] = final
+        metrics_df[f"homogeneity_{colour}_deviation"] = deviation(initial, final)
+
+    return metrics_df.reset_index(drop=True)
+
+
+deviation_columns = {
+    "white_deviation": "Luminance White",
+    "black_deviation": "Luminance Black",
+    "contrast_deviation": "Contrast",
+    "homogeneity_white_deviation": "Homogeneity White",
+    "homogeneity_black_deviation": "Homogeneity Black"
+}
+
+# A deviation is an outlier when its robust z-score (median/MAD) passes default_z_threshold or it lies outside
+# the quartiles by more than default_iqr_factor * IQR; it fails when its absolute value passes the metric's limit.
+default_z_threshold = 3.5
+default_iqr_factor = 1.5
+default_limits = {column: None for column in deviation_columns}
+
+failure_columns = ["dut_name", "metric", "deviation", "robust_z", "outlier", "over_limit"]
+
+
+def campaign_summary(metrics_df, limits=None, z_threshold=default_z_threshold, iqr_factor=default_iqr_factor):
+    # One pass over the DUT x metric matrix, so the cost does not depend on how many DUTs get flagged.
+    limits = dict(default_limits, **(limits or {}))
+    columns = list(deviation_columns)
+    values = metrics_df.reindex(columns=columns).to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+
+    # An all-NaN row stands in for an empty campaign, so every statistic is NaN rather than an error.
+    stats_values = values if len(values) else np.full((1, len(columns)), np.nan)
+    with warnings.catch_warnings():
+        # Metrics without a single value give NaN statistics instead of warnings.
+        warnings.simplefilter("ignore", category=RuntimeWarning)
+        mean = np.nanmean(stats_values, axis=0)
+        median = np.nanmedian(stats_values, axis=0)
+        p05, q1, q3, p95 = np.nanpercentile(stats_values, [5, 25, 75, 95], axis=0)
+        minimum = np.nanmin(stats_values, axis=0)
+        maximum = np.nanmax(stats_values, axis=0)
+        mad = np.nanmedian(np.abs(stats_values - median), axis=0)
+
+    # 0.6745 scales the MAD to a standard deviation for normal data; a zero MAD gives no z-scores.
+    robust_z = 0.6745 * (values - median) / np.where(mad > 0, mad, np.nan)
+    iqr = q3 - q1
+    outlier = (np.abs(robust_z) > z_threshold) | (values < q1 - iqr_factor * iqr) | (values > q3 + iqr_factor * iqr)
+    limit_values = np.array([np.nan if limits[column] is None else limits[column] for column in columns])
+    over_limit = np.abs(values) > limit_values
+
+    summary_df = pd.DataFrame({
+        "metric": [deviation_columns[column] for column in columns],
+        "duts": counts,
+        "mean": mean,
+        "median": median,
+        "p05": p05,
+        "p95": p95,
+        "min": minimum,
+        "max": maximum,
+        "mad": mad,
+        "iqr": iqr,
+        "limit": limit_values,
+        "outliers": outlier.sum(axis=0),
+        "over_limit": over_limit.sum(axis=0),
+        "pass_rate": np.where(counts > 0, (present & ~over_limit).sum(axis=0) / np.maximum(counts, 1) * 100, np.nan)
+    })
+
+    rows, metrics = np.nonzero(outlier | over_limit)
+    failures_df = pd.DataFrame({
+        "dut_name": metrics_df["dut_name"].to_numpy()[rows],
+        "metric": np.array(list(deviation_columns.values()), dtype=object)[metrics],
+        "deviation": values[rows, metrics],
+        "robust_z": robust_z[rows, metrics],
+        "outlier": outlier[rows, metrics],
+        "over_limit": over_limit[rows, metrics]
+    }, columns=failure_columns)
+    failures_df = failures_df.sort_values("robust_z", key=np.abs, ascending=False, na_position="last",
+                                          ignore_index=True)
+
+    return summary_df, failures_df
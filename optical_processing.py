@@ -0,0 +1,647 @@
+import pandas as pd
+import numpy as np
+import openpyxl
+
+import csv
+import gc
+import io
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+
+try:
+    from pyarrow import csv as arrow_csv
+    from pyarrow import string as arrow_string
+except ImportError:  # Without pyarrow, CSV reports go through pandas' own parser.
+    arrow_csv = None
+
+from optical_cache import content_key, dut_key
+from optical_color import extract_color_info
+from optical_diagnostics import Diagnostics, log_record
+
+initial_folder = "Initial"
+final_folder = "Final"
+
+default_max_workers = os.cpu_count() or 1
+
+# The pool is started from ProcessingJob's thread inside the multi-threaded Streamlit server, where a forked
+# worker could inherit a lock another thread holds (e.g. the diagnostics log handler) and hang.
+pool_start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+record_columns = ["spotmeter_white", "spotmeter_black", "first_value_white", "second_value_white",
+                  "first_value_black", "second_value_black"]
+
+# Report spellings rewritten to the marker names the extraction looks for; add new spellings here.
+marker_aliases = {
+    "White Homogeneity": "WhiteHomogeneity",
+    "Black Homogeneity": "BlackHomogeneity"
+}
+
+# What the "measurements" extraction collects in one pass per workbook: every listed spotmeter and marker
+# row of every listed sheet (None = all sheets), with the values in the two given column positions.
+default_extraction_spec = {
+    "sheets": None,
+    "spotmeters": [f"Spotmeter #{spotmeter:03d}" for spotmeter in range(1, 10)],
+    "markers": ["WhiteHomogeneity", "BlackHomogeneity"],
+    "columns": [4, 5]
+}
+
+measurement_columns = ["sheet", "marker", "measurement", "first_value", "second_value"]
+
+# Bump whenever the extraction changes so cached results from older parsers are not reused.
+parser_version = "3"
+
+def is_excel_file(filename):
+    return filename.lower().endswith(('.xls', '.xlsx'))
+
+
+def read_excel_file(file_path):
+    return pd.read_excel(file_path)
+
+
+def read_excel_sheets(file_path, sheets=None):
+    # A single read of the workbook, returned as {sheet: DataFrame}.
+    return pd.read_excel(file_path, sheet_name=None if sheets is None else list(sheets))
+
+
+def header_names(values):
+    # The column names read_excel would give: the header text, "Unnamed: <position>" for an empty cell,
+    # and ".1", ".2", ... on repeats.
+    names = []
+    seen = {}
+    for position, value in enumerate(values):
+        name = f"Unnamed: {position}" if pd.isna(value) or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+def restore_cell_types(df):
+    # CSV and Parquet text columns hold numbers as text; turn them back into numbers next to the text cells,
+    # the way read_excel returns a mixed column.
+    restored_df = df.copy(deep=False)
+    for position in np.flatnonzero((df.dtypes == object).to_numpy()):
+        values = df.iloc[:, position]
+        # to_numeric only finds the numeric cells; its parser can be off in the last digit, so float() converts them.
+        is_number = pd.to_numeric(values, errors="coerce").notna()
+        if is_number.sum() == values.notna().sum():
+            restored = values.astype(float)
+        else:
+            # Empty cells are NaN, as read_excel gives them, not the None the text readers leave.
+            restored = values.where(values.notna(), np.nan).astype(object)
+            restored[is_number] = values[is_number].astype(float)
+        restored_df.isetitem(position, restored)
+    return restored_df
+
+
+def read_csv_file(file):
+    data = file.read()
+    if arrow_csv is not None:
+        # Every column is read as text, because a column that starts with numbers can turn to text further down.
+        header = next(csv.reader([io.BytesIO(data).readline().decode("utf-8-sig")]), [])
+        table = arrow_csv.read_csv(io.BytesIO(data),
+                                   read_options=arrow_csv.ReadOptions(autogenerate_column_names=True),
+                                   convert_options=arrow_csv.ConvertOptions(
+                                       column_types={f"f{i}": arrow_string() for i in range(len(header))},
+                                       strings_can_be_null=True))
+        df = table.to_pandas()
+    else:
+        df = pd.read_csv(io.BytesIO(data), header=None, dtype=str, encoding="utf-8-sig")
+
+    if df.empty:
+        return pd.DataFrame()
+    df.columns = header_names(df.iloc[0])
+    return restore_cell_types(df.iloc[1:].reset_index(drop=True))
+
+
+def read_parquet_file(file):
+    return restore_cell_types(pd.read_parquet(file))
+
+
+def parquet_frame(df):
+    # Mixed text/number columns have no single Parquet type, so they are stored as text and
+    # restore_cell_types turns the numbers back when the file is read.
+    converted_df = df.copy(deep=False)
+    converted_df.columns = [str(column) for column in df.columns]
+    for position in np.flatnonzero((df.dtypes == object).to_numpy()):
+        values = df.iloc[:, position]
+        converted_df.isetitem(position, values.astype(str).where(values.notna()))
+    return converted_df
+
+
+# Report reader per file extension; .xlsx also has the streamed fast path in parse_file.
+report_readers = {
+    ".xls": read_excel_file,
+    ".xlsx": read_excel_file,
+    ".csv": read_csv_file,
+    ".parquet": read_parquet_file
+}
+
+
+def is_report_file(filename):
+    return os.path.splitext(filename.lower())[1] in report_readers
+
+
+def read_report_file(file, file_name):
+    return report_readers[os.path.splitext(file_name.lower())[1]](file)
+
+
+def read_report_sheets(file, file_name, sheets=None):
+    # CSV and Parquet hold a single table, which stands in for the first sheet.
+    if is_excel_file(file_name):
+        return read_excel_sheets(file, sheets)
+    return {0: read_report_file(file, file_name)}
+
+
+def read_measurement_sheets(file, file_name, sheets=None):
+    # The first sheet is read along with the requested ones, so the B/W record comes from the same read.
+    # Returns the first sheet and {sheet: DataFrame} of the requested sheets.
+    if sheets is None or not is_excel_file(file_name):
+        read_sheets = read_report_sheets(file, file_name)
+        return next(iter(read_sheets.values())), read_sheets
+    read_sheets = read_excel_sheets(file, [0] + list(sheets))
+    return read_sheets[0], {sheet: read_sheets[sheet] for sheet in sheets}
+
+
+def remove_empty_rows_from_df(df):
+    return df.dropna(how='all')
+
+
+def keyword_masks(df, keywords):
+    # A number never equals a keyword, so only object columns are lowercased; the others add no matches.
+    text_df = df.iloc[:, np.flatnonzero((df.dtypes == object).to_numpy())]
+    masks = {keyword: np.zeros(len(df), dtype=bool) for keyword in keywords}
+    for position in range(text_df.shape[1]):
+        lowered = text_df.iloc[:, position].astype(str).str.lower().to_numpy()
+        for keyword in keywords:
+            masks[keyword] |= lowered == keyword.lower()
+    return masks
+
+
+def previous_row_mask(mask):
+    previous_mask = np.zeros(len(mask), dtype=bool)
+    previous_mask[:-1] = mask[1:]
+    return previous_mask
+
+
+def scan_keyword_rows(df, keywords, markers):
+    # One lowercase pass over the frame; every lookup below is a boolean mask over it.
+    masks = keyword_masks(df, list(keywords) + [marker for marker in markers if marker not in keywords])
+
+    keyword_mask = np.zeros(len(df), dtype=bool)
+    for keyword in keywords:
+        keyword_mask |= masks[keyword]
+
+    extracted_rows_df = df[keyword_mask]
+    previous_rows = {marker: df[previous_row_mask(masks[marker])] for marker in markers}
+    extracted_previous_rows = {marker: extracted_rows_df[previous_row_mask(masks[marker][keyword_mask])]
+                               for marker in markers}
+
+    return extracted_rows_df, previous_rows, extracted_previous_rows
+
+
+def first_row_containing(df, keyword):
+    mask = keyword_masks(df, [keyword])[keyword]
+    if not mask.any():
+        return None
+    return df.iloc[int(mask.argmax())]
+
+
+def extract_rows_containing_keywords1(df, keywords):
+    extracted_rows_df, previous_rows, _ = scan_keyword_rows(df, keywords, ["WhiteHomogeneity"])
+    return extracted_rows_df, previous_rows["WhiteHomogeneity"]
+
+
+def extract_rows_containing_keywords2(df, keywords):
+    extracted_rows_df, previous_rows, _ = scan_keyword_rows(df, keywords, ["BlackHomogeneity"])
+    return extracted_rows_df, previous_rows["BlackHomogeneity"]
+
+
+def compile_marker_aliases(aliases):
+    # Longest alias first, so an alias that contains a shorter one still wins.
+    ordered_aliases = sorted(aliases, key=len, reverse=True)
+    pattern = re.compile("|".join(re.escape(alias) for alias in ordered_aliases))
+    return pattern, lambda match: aliases[match.group(0)]
+
+
+marker_pattern = compile_marker_aliases(marker_aliases)
+
+
+def normalize_markers(df, aliases=None):
+    # Returns a new frame; only object columns can hold marker text, numeric columns are shared untouched.
+    pattern, replace = marker_pattern if aliases is None else compile_marker_aliases(aliases)
+    normalized_df = df.copy(deep=False)
+
+    for position in np.flatnonzero((df.dtypes == object).to_numpy()):
+        values = df.iloc[:, position]
+        # Report text repeats a lot, so the regex runs once per distinct string and the rewrite is a dict lookup.
+        mapping = {}
+        for value in pd.unique(values.to_numpy()):
+            if isinstance(value, str):
+                normalized = pattern.sub(replace, value)
+                if normalized != value:
+                    mapping[value] = normalized
+        if mapping:
+            normalized_df.isetitem(position, values.replace(mapping))
+
+    return normalized_df
+
+
+def extract_dut_info(df, file_name, folder_type):
+    spotmeter_white_homogeneity = None
+    white_homogeneity_values = None
+    spotmeter_black_homogeneity = None
+    black_homogeneity_values = None
+
+    keywords = ["Spotmeter #005", "WhiteHomogeneity", "BlackHomogeneity"]
+
+    _, _, homogeneity_prev_rows = scan_keyword_rows(df, keywords, ["WhiteHomogeneity", "BlackHomogeneity"])
+    white_homogeneity_prev_rows_df = homogeneity_prev_rows["WhiteHomogeneity"]
+    black_homogeneity_prev_rows_df = homogeneity_prev_rows["BlackHomogeneity"]
+
+    row = first_row_containing(white_homogeneity_prev_rows_df, "Spotmeter #005")
+    if row is not None:
+        spotmeter_white_homogeneity = row["Unnamed: 4"]
+
+    row = first_row_containing(white_homogeneity_prev_rows_df, "WhiteHomogeneity")
+    if row is not None:
+        white_homogeneity_values = (row["Unnamed: 4"], row["Unnamed: 5"])
+
+    row = first_row_containing(black_homogeneity_prev_rows_df, "Spotmeter #005")
+    if row is not None:
+        spotmeter_black_homogeneity = row["Unnamed: 4"]
+
+    row = first_row_containing(black_homogeneity_prev_rows_df, "BlackHomogeneity")
+    if row is not None:
+        black_homogeneity_values = (row["Unnamed: 4"], row["Unnamed: 5"])
+
+    return {
+        "file_name": file_name,
+        "initial_final": folder_type,
+        "spotmeter_white_homogeneity": spotmeter_white_homogeneity,
+        "white_homogeneity_values": white_homogeneity_values,
+        "spotmeter_black_homogeneity": spotmeter_black_homogeneity,
+        "black_homogeneity_values": black_homogeneity_values
+    }
+
+
+def row_cell(row, index):
+    return row[index] if index < len(row) else None
+
+
+def measurement_cell(row, index):
+    value = row_cell(row, index)
+    return np.nan if value is None else value
+
+
+def normalize_cell(value):
+    pattern, replace = marker_pattern
+    return pattern.sub(replace, value).lower()
+
+
+def stream_dut_values(file):
+    # Same lookup as extract_dut_info, but walks the first sheet lazily and stops at the last value we need.
+    # Returns None whenever the layout does not match, so the caller can fall back to the full DataFrame.
+    keywords = {"spotmeter #005", "whitehomogeneity", "blackhomogeneity"}
+    markers = {"whitehomogeneity": "white", "blackhomogeneity": "black"}
+    found = {}
+
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True, keep_links=False)
+    rows = None
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+
+        header = next(rows, None)
+        if header is None or row_cell(header, 4) not in (None, "") or row_cell(header, 5) not in (None, ""):
+            return None
+
+        previous_row = None
+        previous_keywords = None
+        for row in rows:
+            # Only text cells can hold a marker, so numeric cells are never stringified.
+            row_keywords = keywords.intersection(normalize_cell(value) for value in row if isinstance(value, str))
+            if not row_keywords:
+                continue
+
+            if previous_row is not None:
+                for marker, colour in markers.items():
+                    if marker not in row_keywords:
+                        continue
+                    if "spotmeter #005" in previous_keywords:
+                        found.setdefault(f"spotmeter_{colour}_homogeneity", measurement_cell(previous_row, 4))
+                    if marker in previous_keywords:
+                        found.setdefault(f"{colour}_homogeneity_values",
+                                         (measurement_cell(previous_row, 4), measurement_cell(previous_row, 5)))
+
+            if len(found) == 4:
+                break
+            previous_row = row
+            previous_keywords = row_keywords
+    finally:
+        # Closing the row generator now frees its XML parser, which would otherwise wait for the cycle collector.
+        if rows is not None:
+            rows.close()
+        workbook.close()
+
+    if len(found) < 4:
+        return None
+
+    keys = ["spotmeter_white_homogeneity", "white_homogeneity_values",
+            "spotmeter_black_homogeneity", "black_homogeneity_values"]
+    return {key: found[key] for key in keys}
+
+
+def dut_records_frame(data, prefix=None):
+    rows = []
+    for info in data:
+        white_values = info["white_homogeneity_values"] or (None, None)
+        black_values = info["black_homogeneity_values"] or (None, None)
+        rows.append({
+            "dut_name": dut_key(info["file_name"]),
+            "spotmeter_white": info["spotmeter_white_homogeneity"],
+            "spotmeter_black": info["spotmeter_black_homogeneity"],
+            "first_value_white": white_values[0],
+            "second_value_white": white_values[1],
+            "first_value_black": black_values[0],
+            "second_value_black": black_values[1]
+        })
+
+    df = pd.DataFrame(rows, columns=["dut_name"] + record_columns, dtype=object)
+    if prefix:
+        df = df.rename(columns={column: f"{prefix}_{column}" for column in record_columns})
+    return df
+
+
+def pair_duts(initial_data, final_data):
+    initial_df = dut_records_frame(initial_data, "initial")
+    final_df = dut_records_frame(final_data, "final")
+
+    # Inner merge keeps the Initial upload order, like the nested loops it replaces.
+    paired_df = initial_df.merge(final_df, on="dut_name", how="inner")
+    unmatched_initial = initial_df.loc[~initial_df["dut_name"].isin(final_df["dut_name"]), "dut_name"].tolist()
+    unmatched_final = final_df.loc[~final_df["dut_name"].isin(initial_df["dut_name"]), "dut_name"].tolist()
+
+    return paired_df, unmatched_initial, unmatched_final
+
+
+def column_values(df, rows, position):
+    if position >= df.shape[1]:
+        return np.full(len(rows), np.nan)
+    return pd.to_numeric(pd.Series(df.iloc[rows, position].to_numpy()), errors="coerce").to_numpy()
+
+
+def extract_measurements(df, spec=None):
+    # A spotmeter row belongs to the block of the first marker row below it. Only the first row of each
+    # (marker, measurement) is kept, as in the single-spotmeter lookup.
+    spec = spec or default_extraction_spec
+    markers = list(spec["markers"])
+    spotmeters = list(spec["spotmeters"])
+    masks = keyword_masks(df, list(dict.fromkeys(markers + spotmeters)))
+
+    row_count = len(df)
+    marker_index = np.full(row_count, -1)
+    for i, marker in reversed(list(enumerate(markers))):
+        marker_index[masks[marker]] = i
+
+    marker_rows = np.where(marker_index >= 0, np.arange(row_count), row_count)
+    next_marker_row = np.minimum.accumulate(marker_rows[::-1])[::-1]
+    block_marker = np.append(marker_index, -1)[next_marker_row]
+
+    rows, block_markers, names = [], [], []
+    for spotmeter in spotmeters:
+        found = np.flatnonzero(masks[spotmeter] & (marker_index < 0) & (block_marker >= 0))
+        rows.append(found)
+        block_markers.append(block_marker[found])
+        names.append(np.full(len(found), spotmeter, dtype=object))
+    for i, marker in enumerate(markers):
+        found = np.flatnonzero(marker_index == i)
+        rows.append(found)
+        block_markers.append(np.full(len(found), i))
+        names.append(np.full(len(found), marker, dtype=object))
+
+    rows = np.concatenate(rows).astype(int)
+    first_position, second_position = spec["columns"]
+    measurements_df = pd.DataFrame({
+        "row": rows,
+        "marker": np.array(markers, dtype=object)[np.concatenate(block_markers).astype(int)] if len(rows) else [],
+        "measurement": np.concatenate(names),
+        "first_value": column_values(df, rows, first_position),
+        "second_value": column_values(df, rows, second_position)
+    })
+
+    measurements_df = measurements_df.sort_values("row", kind="stable").drop_duplicates(["marker", "measurement"])
+    return measurements_df.drop(columns="row").reset_index(drop=True)
+
+
+def extract_workbook_measurements(sheets, file_name, folder_type, spec=None):
+    frames = [extract_measurements(normalize_markers(remove_empty_rows_from_df(df)), spec).assign(sheet=str(sheet))
+              for sheet, df in sheets.items()]
+    measurements_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=measurement_columns)
+    return {
+        "file_name": file_name,
+        "initial_final": folder_type,
+        "measurements": measurements_df[measurement_columns].to_dict("list")
+    }
+
+
+def measurements_frame(data):
+    # Long format: one row per DUT, side, sheet, marker and measurement.
+    frames = [pd.DataFrame(info["measurements"], columns=measurement_columns)
+              .assign(dut_name=dut_key(info["file_name"]), initial_final=info["initial_final"]) for info in data]
+    columns = ["dut_name", "initial_final"] + measurement_columns
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)[columns]
+
+
+# Per-page extraction run on the normalised frame; the black/white one also has the streamed .xlsx fast path.
+extractors = {
+    "black_white": extract_dut_info,
+    "color": extract_color_info
+}
+
+
+def process_file(file_name, content, folder_type, kind="black_white", spec=None):
+    result = parse_file(file_name, content, folder_type, kind, spec)
+    # The xml parsers behind openpyxl leave reference cycles behind; they are collected after every file
+    # instead of piling up until the next full collection, so memory stays bounded by the files in flight.
+    gc.collect()
+    return result
+
+
+def parse_file(file_name, content, folder_type, kind="black_white", spec=None):
+    # Runs inside the worker processes, so failures come back as text instead of being raised.
+    diagnostics = Diagnostics(file_name=file_name, initial_final=folder_type, size_bytes=len(content),
+                              cache_hit=False, kind=kind)
+
+    if kind == "measurements":
+        # The B/W record and every requested measurement, from a single read of the workbook.
+        diagnostics.set(path="sheets")
+        spec = spec or default_extraction_spec
+        try:
+            with diagnostics.stage("read"):
+                first_df, sheets = read_measurement_sheets(io.BytesIO(content), file_name, spec["sheets"])
+            diagnostics.set(sheets=len(sheets), rows=sum(len(df) for df in sheets.values()))
+            with diagnostics.stage("extract"):
+                info = extract_dut_info(normalize_markers(remove_empty_rows_from_df(first_df)), file_name, folder_type)
+                info.update(extract_workbook_measurements(sheets, file_name, folder_type, spec))
+            return info, None, diagnostics.finish()
+        except Exception as e:
+            diagnostics.set(error=str(e))
+            return None, str(e), diagnostics.finish()
+
+    if kind == "black_white" and file_name.lower().endswith(".xlsx"):
+        with diagnostics.stage("stream_extract"):
+            try:
+                values = stream_dut_values(io.BytesIO(content))
+            except Exception:
+                values = None
+        if values is not None:
+            info = {"file_name": file_name, "initial_final": folder_type}
+            info.update(values)
+            diagnostics.set(path="stream")
+            return info, None, diagnostics.finish()
+
+    diagnostics.set(path="dataframe")
+    try:
+        # Each step rebinds df, so only one version of the sheet is alive at a time.
+        with diagnostics.stage("read"):
+            df = read_report_file(io.BytesIO(content), file_name)
+        diagnostics.set(rows=len(df), columns=len(df.columns))
+        with diagnostics.stage("clean"):
+            df = remove_empty_rows_from_df(df)
+        diagnostics.set(rows_cleaned=len(df))
+        with diagnostics.stage("normalize"):
+            df = normalize_markers(df)
+        with diagnostics.stage("extract"):
+            info = extractors[kind](df, file_name, folder_type)
+        return info, None, diagnostics.finish()
+    except Exception as e:
+        diagnostics.set(error=str(e))
+        return None, str(e), diagnostics.finish()
+
+
+def cache_version(kind, spec=None):
+    # The extraction spec is part of the key, so changing it never serves results parsed for another spec.
+    version = f"{parser_version}:{kind}"
+    return version if spec is None else f"{version}:{json.dumps(spec, sort_keys=True, default=str)}"
+
+
+def cached_result(file_name, content, folder_type, cache, kind, spec=None):
+    key = content_key(content, cache_version(kind, spec))
+    info = cache.get(key) if cache is not None else None
+    if info is None:
+        return key, None
+
+    stats = {"file_name": file_name, "initial_final": folder_type, "size_bytes": len(content),
+             "cache_hit": True, "kind": kind, "stages": {}}
+    return key, (dict(info, file_name=file_name, initial_final=folder_type), None, stats)
+
+
+def store_result(key, result, cache):
+    info, error, stats = result
+    if error is None and cache is not None and not stats["cache_hit"]:
+        cache.put(key, info)
+    log_record(stats)
+    return result
+
+
+def pending_result(entry, folder_type, cache):
+    file_name, key, result = entry
+    if not isinstance(result, tuple):
+        try:
+            result = result.result()
+        except Exception as e:
+            result = None, str(e), {"file_name": file_name, "initial_final": folder_type, "cache_hit": False,
+                                    "error": str(e), "stages": {}}
+    return store_result(key, result, cache)
+
+
+def drain(items):
+    while items:
+        yield items.popleft()
+
+
+def iter_process_files(files, folder_type, max_workers=1, cache=None, kind="black_white", spec=None):
+    # files is read lazily and every content is released once its compact record exists, so memory holds
+    # the files in flight (at most 2 * max_workers) plus the results.
+    files = iter(files)
+    head = deque(islice(files, max(max_workers, 1)))
+    workers = min(max_workers, len(head))
+    files = chain(drain(head), files)
+
+    if workers <= 1:
+        for file_name, content in files:
+            key, result = cached_result(file_name, content, folder_type, cache, kind, spec)
+            if result is None:
+                result = process_file(file_name, content, folder_type, kind, spec)
+            del content
+            yield store_result(key, result, cache)
+        return
+
+    pending = deque()
+    context = multiprocessing.get_context(pool_start_method)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        for file_name, content in files:
+            key, result = cached_result(file_name, content, folder_type, cache, kind, spec)
+            if result is None:
+                result = executor.submit(process_file, file_name, content, folder_type, kind, spec)
+            del content
+            pending.append((file_name, key, result))
+            while len(pending) >= 2 * workers:
+                yield pending_result(pending.popleft(), folder_type, cache)
+
+        while pending:
+            yield pending_result(pending.popleft(), folder_type, cache)
+
+
+class ProcessingJob:
+    # Parses batches of (folder_type, keys, files) on a background thread; the page drains finished records
+    # while the rest are still being parsed. files is consumed lazily on that thread.
+    def __init__(self, batches, max_workers=1, cache=None, kind="black_white", spec=None):
+        self.total = sum(len(keys) for _, keys, _ in batches)
+        self.results = []
+        self.consumed = 0
+        self.error = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self.thread = threading.Thread(target=self.run, args=(batches, max_workers, cache, kind, spec), daemon=True)
+        self.thread.start()
+
+    def run(self, batches, max_workers, cache, kind, spec):
+        try:
+            for folder_type, keys, files in batches:
+                for key, result in zip(keys, iter_process_files(files, folder_type, max_workers, cache, kind, spec)):
+                    self.results.append((folder_type, key, result))
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.finished = time.perf_counter()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def eta_seconds(self):
+        completed = len(self.results)
+        if not completed or self.done:
+            return None
+        return (time.perf_counter() - self.started) / completed * (self.total - completed)
+
+    def drain(self):
+        # Results finished since the previous call, in upload order.
+        completed = len(self.results)
+        drained = self.results[self.consumed:completed]
+        self.consumed = completed
+        return drained
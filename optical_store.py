@@ -0,0 +1,111 @@
+import sqlite3
+from contextlib import closing
+from datetime import date
+
+import pandas as pd
+
+from optical_metrics import compute_metrics
+from optical_processing import dut_records_frame, final_folder, initial_folder, record_columns
+
+default_store_path = "optical_store.sqlite"
+
+schema = f"""
+CREATE TABLE IF NOT EXISTS dut_measurements (
+    campaign TEXT NOT NULL,
+    measured_on TEXT NOT NULL,
+    initial_final TEXT NOT NULL,
+    dut_name TEXT NOT NULL,
+    {", ".join(f"{column} REAL" for column in record_columns)},
+    PRIMARY KEY (campaign, initial_final, dut_name)
+);
+CREATE INDEX IF NOT EXISTS dut_measurements_dut_name ON dut_measurements (dut_name);
+CREATE INDEX IF NOT EXISTS dut_measurements_campaign_date ON dut_measurements (measured_on, campaign);
+"""
+
+
+class MeasurementStore:
+    # One row per (campaign, Initial/Final, DUT); campaign and date are indexed so a query only reads its slice.
+    def __init__(self, path=default_store_path):
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.executescript(schema)
+
+    def _connect(self):
+        # A fresh connection per call, because Streamlit sessions run on different threads.
+        return sqlite3.connect(self.path)
+
+    def append(self, data, campaign, measured_on=None):
+        if not data:
+            return 0
+
+        measured_on = measured_on or date.today().isoformat()
+        records_df = dut_records_frame(data)
+        values = records_df[record_columns].apply(pd.to_numeric, errors="coerce")
+        values = values.astype(object).where(values.notna(), None)
+
+        rows = [(campaign, measured_on, info["initial_final"], dut_name, *measurement)
+                for info, dut_name, measurement in zip(data, records_df["dut_name"], values.itertuples(index=False))]
+
+        columns = ["campaign", "measured_on", "initial_final", "dut_name"] + record_columns
+        # Re-saving a campaign replaces its DUT rows instead of duplicating them.
+        query = (f"INSERT OR REPLACE INTO dut_measurements ({', '.join(columns)}) "
+                 f"VALUES ({', '.join('?' for _ in columns)})")
+        with closing(self._connect()) as connection, connection:
+            connection.executemany(query, rows)
+        return len(rows)
+
+    def load(self, campaigns=None, dut_name=None, since=None, until=None):
+        conditions = []
+        params = []
+        if campaigns:
+            conditions.append(f"campaign IN ({', '.join('?' for _ in campaigns)})")
+            params.extend(campaigns)
+        if dut_name:
+            conditions.append("dut_name = ?")
+            params.append(dut_name)
+        if since:
+            conditions.append("measured_on >= ?")
+            params.append(since)
+        if until:
+            conditions.append("measured_on <= ?")
+            params.append(until)
+
+        query = "SELECT * FROM dut_measurements"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY measured_on, campaign, dut_name"
+
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query, connection, params=params)
+
+    def campaigns(self):
+        query = """
+            SELECT campaign, MIN(measured_on) AS measured_on, initial_final, COUNT(*) AS duts
+            FROM dut_measurements GROUP BY campaign, initial_final ORDER BY measured_on, campaign
+        """
+        with closing(self._connect()) as connection:
+            return pd.read_sql_query(query, connection)
+
+    def dut_history(self, dut_name):
+        return self.load(dut_name=dut_name)
+
+    def campaign_metrics(self, campaigns=None, since=None, until=None):
+        stored_df = self.load(campaigns=campaigns, since=since, until=until)
+        keys = ["campaign", "dut_name"]
+
+        def side(folder_type, prefix):
+            side_df = stored_df[stored_df["initial_final"] == folder_type]
+            return side_df[keys + record_columns].rename(
+                columns={column: f"{prefix}_{column}" for column in record_columns})
+
+        paired_df = side(initial_folder, "initial").merge(side(final_folder, "final"), on=keys, how="inner")
+        metrics_df = compute_metrics(paired_df)
+        metrics_df.insert(0, "campaign", paired_df["campaign"].to_numpy())
+        return metrics_df
+
+    def campaign_summary(self, campaigns=None, since=None, until=None):
+        metrics_df = self.campaign_metrics(campaigns, since, until)
+        deviation_columns = [column for column in metrics_df.columns if column.endswith("_deviation")]
+        summary_df = metrics_df.groupby("campaign", sort=False)[deviation_columns].median()
+        summary_df.insert(0, "duts", metrics_df.groupby("campaign", sort=False).size())
+        return summary_df.reset_index()
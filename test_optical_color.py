@@ -0,0 +1,29 @@
+import io
+
+import pandas as pd
+
+from optical_color import extract_color_points
+from optical_processing import read_csv_file
+
+
+def test_header_is_a_label_row():
+    df = pd.DataFrame([["Spotmeter #001", 0.31, 0.33, 200.0], ["Spotmeter #002", 0.32, 0.34, 210.0]],
+                      columns=["Point", "x", "y", "Lv"])
+    points_df = extract_color_points(df)
+
+    assert points_df["spotmeter"].tolist() == ["Spotmeter #001", "Spotmeter #002"]
+    assert points_df["x"].tolist() == [0.31, 0.32]
+    assert points_df["luminance"].tolist() == [200.0, 210.0]
+
+
+def test_csv_header_line_is_a_label_row():
+    df = read_csv_file(io.BytesIO(b"Point,x,y,Lv\nSpotmeter #001,0.31,0.33,200\n"))
+
+    assert extract_color_points(df)[["x", "y", "luminance"]].values.tolist() == [[0.31, 0.33, 200.0]]
+
+
+def test_label_row_below_header_takes_over():
+    df = pd.DataFrame([["Red", None, None, None], ["Point", "Lv", "x", "y"], ["Spotmeter #001", 150.0, 0.6, 0.3]],
+                      columns=["Point", "x", "y", "Lv"])
+
+    assert extract_color_points(df)[["x", "y", "luminance"]].values.tolist() == [[0.6, 0.3, 150.0]]
@@ -0,0 +1,188 @@
+import io
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from optical_benchmark import generate_report
+from optical_processing import (extract_dut_info, extract_rows_containing_keywords1, extract_rows_containing_keywords2,
+                                normalize_markers, pair_duts, parquet_frame, process_file, read_csv_file,
+                                read_excel_file, read_parquet_file, remove_empty_rows_from_df)
+
+keywords = ["Spotmeter #005", "WhiteHomogeneity", "BlackHomogeneity"]
+
+
+# The row-by-row scanners the mask-based ones replaced, kept as the reference they must keep matching.
+def reference_rows_containing_keywords(df, keywords, marker):
+    extracted_rows = []
+    marker_previous_rows = []
+    previous_row = None
+
+    for _, row in df.iterrows():
+        if marker.lower() in row.astype(str).str.lower().tolist() and previous_row is not None:
+            marker_previous_rows.append(previous_row)
+
+        for keyword in keywords:
+            if keyword.lower() in row.astype(str).str.lower().tolist():
+                extracted_rows.append(row)
+                break
+
+        previous_row = row
+
+    return pd.DataFrame(extracted_rows), pd.DataFrame(marker_previous_rows)
+
+
+def reference_dut_info(df, file_name, folder_type):
+    info = {"file_name": file_name, "initial_final": folder_type}
+
+    for colour, marker in (("white", "WhiteHomogeneity"), ("black", "BlackHomogeneity")):
+        extracted_rows_df, _ = reference_rows_containing_keywords(df, keywords, marker)
+        _, previous_rows_df = reference_rows_containing_keywords(extracted_rows_df, keywords, marker)
+        info[f"spotmeter_{colour}_homogeneity"] = None
+        info[f"{colour}_homogeneity_values"] = None
+
+        for _, row in previous_rows_df.iterrows():
+            if "Spotmeter #005".lower() in row.astype(str).str.lower().tolist():
+                info[f"spotmeter_{colour}_homogeneity"] = row["Unnamed: 4"]
+                break
+
+        for _, row in previous_rows_df.iterrows():
+            if marker.lower() in row.astype(str).str.lower().tolist():
+                info[f"{colour}_homogeneity_values"] = (row["Unnamed: 4"], row["Unnamed: 5"])
+                break
+
+    return info
+
+
+def report_frame(rows, seed):
+    df = read_excel_file(io.BytesIO(generate_report(rows, seed)))
+    return normalize_markers(remove_empty_rows_from_df(df))
+
+
+def random_frame(seed):
+    # Marker and keyword cells scattered over random rows, including adjacent markers and mixed case.
+    rng = np.random.default_rng(seed)
+    cells = np.array(["Spotmeter #005", "spotmeter #005", "WhiteHomogeneity", "BLACKHOMOGENEITY", "Data", "ok", None],
+                     dtype=object)
+    values = rng.choice(cells, size=(60, 6), p=[0.08, 0.04, 0.1, 0.1, 0.3, 0.08, 0.3]).astype(object)
+    numbers = rng.uniform(0, 500, size=(60, 6))
+    values[:, 4:] = np.where(rng.random((60, 2)) < 0.7, numbers[:, 4:], values[:, 4:])
+    return pd.DataFrame(values, columns=["Measurement report"] + [f"Unnamed: {i}" for i in range(1, 6)])
+
+
+def edge_frames():
+    columns = ["Measurement report"] + [f"Unnamed: {i}" for i in range(1, 6)]
+    yield pd.DataFrame(columns=columns)
+    yield pd.DataFrame([["WhiteHomogeneity", None, None, None, 1.0, 2.0]], columns=columns)
+    yield pd.DataFrame([[None, "Data", 1.0, 2.0, 3.0, 4.0]] * 3, columns=columns)
+
+
+frames = ([report_frame(rows, seed) for rows, seed in ((20, 0), (200, 1), (1, 2))]
+          + [random_frame(seed) for seed in range(6)] + list(edge_frames()))
+
+
+def assert_same_rows(actual, expected):
+    if expected.empty:
+        assert actual.empty
+    else:
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+
+@pytest.mark.parametrize("df", frames)
+@pytest.mark.parametrize("scanner, marker", [(extract_rows_containing_keywords1, "WhiteHomogeneity"),
+                                             (extract_rows_containing_keywords2, "BlackHomogeneity")])
+def test_keyword_scan_matches_reference(df, scanner, marker):
+    extracted_rows_df, previous_rows_df = scanner(df, keywords)
+    expected_rows_df, expected_previous_rows_df = reference_rows_containing_keywords(df, keywords, marker)
+
+    assert_same_rows(extracted_rows_df, expected_rows_df)
+    assert_same_rows(previous_rows_df, expected_previous_rows_df)
+
+
+@pytest.mark.parametrize("df", frames)
+def test_dut_info_matches_reference(df):
+    assert extract_dut_info(df, "DUT.xlsx", "Initial") == reference_dut_info(df, "DUT.xlsx", "Initial")
+
+
+def test_duts_pair_across_report_formats():
+    df = frames[0]
+    initial_data = [extract_dut_info(df, "DUT_1.xlsx", "Initial")]
+    final_data = [extract_dut_info(df, "DUT_1.parquet", "Final")]
+    paired_df, unmatched_initial, unmatched_final = pair_duts(initial_data, final_data)
+
+    assert paired_df["dut_name"].tolist() == ["DUT_1"]
+    assert unmatched_initial == [] and unmatched_final == []
+
+
+def test_measurements_carry_the_black_white_record():
+    content = generate_report(50, 3)
+    black_white, _, _ = process_file("DUT.xlsx", content, "Initial")
+    measurements, error, _ = process_file("DUT.xlsx", content, "Initial", "measurements")
+
+    assert error is None
+    assert {key: measurements[key] for key in black_white} == black_white
+    assert measurements["measurements"]["marker"]
+
+
+def excel_content(df):
+    content = io.BytesIO()
+    df.to_excel(content, index=False)
+    return content.getvalue()
+
+
+@pytest.mark.filterwarnings("error::FutureWarning")
+@pytest.mark.parametrize("content", [generate_report(rows, seed) for rows, seed in ((20, 0), (200, 1), (1, 2))]
+                         + [excel_content(random_frame(seed)) for seed in range(3)])
+def test_csv_and_parquet_read_like_excel(content):
+    excel_df = read_excel_file(io.BytesIO(content))
+    parquet_content = io.BytesIO()
+    parquet_frame(excel_df).to_parquet(parquet_content, index=False)
+    parquet_content.seek(0)
+    expected = extract_dut_info(normalize_markers(remove_empty_rows_from_df(excel_df)), "DUT", "Initial")
+
+    for df in (read_csv_file(io.BytesIO(excel_df.to_csv(index=False).encode())), read_parquet_file(parquet_content)):
+        pd.testing.assert_frame_equal(df, excel_df)
+        info = extract_dut_info(normalize_markers(remove_empty_rows_from_df(df)), "DUT", "Initial")
+        # repr tells None from NaN, which == on the value tuples would not.
+        assert repr(info) == repr(expected)
+
+
+# The two in-place replaces normalize_markers replaced, applied to a copy and generalised to an alias table.
+# Longest alias first, as the alias pattern does, so an alias that contains another one still wins.
+def reference_normalize_markers(df, aliases=None):
+    df = df.copy()
+    if aliases is None:
+        df.replace('White Homogeneity', 'WhiteHomogeneity', regex=True, inplace=True)
+        df.replace('Black Homogeneity', 'BlackHomogeneity', regex=True, inplace=True)
+        return df
+    for alias in sorted(aliases, key=len, reverse=True):
+        df.replace(re.escape(alias), aliases[alias], regex=True, inplace=True)
+    return df
+
+
+custom_aliases = {
+    "White Homogeneity": "WhiteHomogeneity",
+    "White Homogeneity (center)": "WhiteHomogeneityCenter",
+    "Homog. Black": "BlackHomogeneity"
+}
+
+
+def alias_frame(seed):
+    rng = np.random.default_rng(seed)
+    cells = np.array(["White Homogeneity", "Black Homogeneity", "White Homogeneity (center)", "Homog. Black",
+                      "Spotmeter #005 White Homogeneity", "White  Homogeneity", "WhiteHomogeneity", "ok", None],
+                     dtype=object)
+    df = pd.DataFrame(rng.choice(cells, size=(40, 6)),
+                      columns=["Measurement report"] + [f"Unnamed: {i}" for i in range(1, 6)])
+    df["Unnamed: 4"] = rng.uniform(0, 500, size=40)
+    return df
+
+
+@pytest.mark.parametrize("df", frames + [alias_frame(seed) for seed in range(4)])
+@pytest.mark.parametrize("aliases", [None, custom_aliases])
+def test_normalize_markers_matches_reference(df, aliases):
+    original_df = df.copy()
+
+    pd.testing.assert_frame_equal(normalize_markers(df, aliases), reference_normalize_markers(df, aliases))
+    pd.testing.assert_frame_equal(df, original_df)